@@ -15,7 +15,11 @@ from templates import (
     TemplateRegistry,
 )
 from tools import (
+    Plan,
+    PlanHistoryEntry,
+    PlanStep,
     add_step_dependency,
+    analyze_plan,
     appknox_security_audit,
     ask_clarifying_question,
     assess_plan_risks,
@@ -61,9 +65,13 @@ __all__ = [
     "assess_plan_risks",
     "estimate_plan_duration",
     "suggest_plan_improvements",
+    "analyze_plan",
     "mark_milestone",
     "expand_step_with_substeps",
     "fork_plan",
+    "Plan",
+    "PlanStep",
+    "PlanHistoryEntry",
     "SessionManager",
     "SessionOperations",
     "TemplateRegistry",
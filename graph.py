@@ -1,7 +1,10 @@
 """LangGraph agent workflow for Planning Agent."""
 
 import json
+from collections import deque
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Annotated, Any, Literal, TypedDict
 
 import tiktoken
@@ -17,6 +20,7 @@ from langgraph.graph.message import add_messages
 from llm_providers import get_llm
 from tools import (
     add_step_dependency,
+    analyze_plan,
     appknox_security_audit,
     ask_clarifying_question,
     assess_plan_risks,
@@ -51,11 +55,31 @@ class AgentState(TypedDict):
     user_preferences: dict[str, Any]
     last_action: str
     session_id: str
-    undo_stack: list[dict[str, Any]]
-    redo_stack: list[dict[str, Any]]
+    undo_stack: deque[dict[str, Any]]
+    redo_stack: deque[dict[str, Any]]
     tags: list[str]
 
 
+# Immutable AgentState defaults; mutable containers are created fresh in new_state()
+_DEFAULT_AGENT_STATE = MappingProxyType(
+    {"summary": "", "conversation_turn": 0, "last_action": "", "session_id": ""}
+)
+
+
+def new_state(**overrides: Any) -> AgentState:
+    """Create a fresh AgentState, with any given fields overriding the defaults."""
+    return {
+        **_DEFAULT_AGENT_STATE,
+        "messages": [],
+        "current_plan": {},
+        "user_preferences": {},
+        "undo_stack": deque(),
+        "redo_stack": deque(),
+        "tags": [],
+        **overrides,
+    }
+
+
 class ActionType(str, Enum):
     """Action types for user intent analysis."""
 
@@ -94,18 +118,31 @@ def normalize_content_for_encoding(content) -> str:
         return str(content)
 
 
-def count_tokens(messages: list[BaseMessage], model: str = "gpt-4") -> int:
-    """Count tokens in a list of messages."""
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
+        return tiktoken.get_encoding("cl100k_base")
 
-    total_tokens = 0
-    for msg in messages:
-        content_str = normalize_content_for_encoding(msg.content)
-        total_tokens += len(encoding.encode(content_str))
-        total_tokens += len(encoding.encode(msg.type))
+
+@lru_cache(maxsize=64)
+def _count_type_tokens(model: str, msg_type: str) -> int:
+    return len(_get_encoding(model).encode(msg_type))
+
+
+def count_tokens(messages: list[BaseMessage], model: str = "gpt-4") -> int:
+    """Count tokens in a list of messages."""
+    if not messages:
+        return 0
+
+    encoding = _get_encoding(model)
+    # Encode all message contents in one call into tiktoken
+    encoded = encoding.encode_ordinary_batch(
+        [normalize_content_for_encoding(msg.content) for msg in messages]
+    )
+    total_tokens = sum(map(len, encoded))
+    total_tokens += sum(_count_type_tokens(model, msg.type) for msg in messages)
     return total_tokens
 
 
@@ -121,7 +158,17 @@ def analyze_user_intent(state: AgentState) -> str:
     if not isinstance(last_message, HumanMessage):
         return ActionType.GENERAL_CHAT
 
-    user_input = last_message.content.lower()
+    content = last_message.content
+    if not isinstance(content, str):
+        content = normalize_content_for_encoding(content)
+
+    return _classify_intent(content, bool(current_plan))
+
+
+@lru_cache(maxsize=1024)
+def _classify_intent(text: str, has_plan: bool) -> ActionType:
+    """Map a user message to an action; pure, so repeated prompts hit the cache."""
+    user_input = text.lower()
 
     if any(word in user_input for word in ["summary", "summarize", "overview"]):
         return ActionType.EXECUTIVE_SUMMARY
@@ -141,7 +188,7 @@ def analyze_user_intent(state: AgentState) -> str:
     if any(word in user_input for word in ["fork", "copy plan", "duplicate"]):
         return ActionType.FORK_PLAN
 
-    if current_plan and any(
+    if has_plan and any(
         word in user_input
         for word in [
             "add",
@@ -249,6 +296,7 @@ def agent_node(state: AgentState) -> dict[str, Any]:
         assess_plan_risks,
         estimate_plan_duration,
         suggest_plan_improvements,
+        analyze_plan,
         mark_milestone,
         expand_step_with_substeps,
         fork_plan,
@@ -305,6 +353,7 @@ def agent_node(state: AgentState) -> dict[str, Any]:
    - Use assess_plan_risks to identify potential risks
    - Use estimate_plan_duration to get time estimates
    - Use suggest_plan_improvements to get enhancement ideas
+   - Use analyze_plan to get risks, time estimates and suggestions together in one call
    - Use mark_milestone to mark key achievement points
    - Use add_step_dependency when steps depend on others
    - Use expand_step_with_substeps to break down complex steps
@@ -344,8 +393,7 @@ For PLAN MODIFICATIONS:
 
 For VALIDATION:
 1. validate_plan → Check for issues
-2. assess_plan_risks → Identify risks
-3. suggest_plan_improvements → Get suggestions
+2. analyze_plan → Identify risks, estimate duration and get suggestions
 
 ## RULES
 - ALWAYS use tools for actions - never just chat about plans without tools
@@ -407,6 +455,7 @@ def tool_node(state: AgentState) -> dict[str, Any]:
         "assess_plan_risks": assess_plan_risks,
         "estimate_plan_duration": estimate_plan_duration,
         "suggest_plan_improvements": suggest_plan_improvements,
+        "analyze_plan": analyze_plan,
         "mark_milestone": mark_milestone,
         "expand_step_with_substeps": expand_step_with_substeps,
         "fork_plan": fork_plan,
@@ -446,6 +495,7 @@ def tool_node(state: AgentState) -> dict[str, Any]:
             "assess_plan_risks",
             "estimate_plan_duration",
             "suggest_plan_improvements",
+            "analyze_plan",
             "mark_milestone",
             "expand_step_with_substeps",
             "fork_plan",
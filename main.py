@@ -1,31 +1,32 @@
 """CLI entry point and UI for Planning Agent."""
 
-import argparse
 import asyncio
+import hashlib
+import json
 import logging
 import os
-import subprocess
 import sys
 import time
-from datetime import datetime
-from pathlib import Path
-from typing import Any
+from functools import lru_cache
+from typing import Any, Callable
 
 from dotenv import load_dotenv
 from langchain_core.messages import AIMessage, HumanMessage
 from rich.console import Console
 from rich.live import Live
 from rich.markdown import Markdown
-from rich.table import Table
+from rich.segment import Segment
+from rich.style import Style
 from rich.text import Text
 
 from artifacts import compute_diff, display_artifacts, save_plan_artifact
+from completer import CommandCompleter, get_input_with_menu
 from config import CONFIG_DIR, interactive_setup, is_configured, load_config
 from gantt_chart import export_gantt_chart
-from graph import app, context_management_node
+from graph import app, context_management_node, new_state
 from import_export import export_plan_to_file, import_plan_from_file
 from llm_providers import get_current_provider_info, switch_provider
-from sessions import SessionManager, SessionOperations
+from sessions import BackgroundSaver, SessionManager, SessionOperations
 from templates import TemplateApplicator, TemplateRegistry
 from tools import UndoRedoManager, get_plan_statistics
 
@@ -76,12 +77,15 @@ TOOL_INFO = {
     "assess_plan_risks": ("Assessing risks...", "orange3"),
     "estimate_plan_duration": ("Estimating duration...", "cyan"),
     "suggest_plan_improvements": ("Analyzing improvements...", "green"),
+    "analyze_plan": ("Analyzing plan...", "green"),
     "fork_plan": ("Forking plan...", "blue"),
     "mark_milestone": ("Marking milestone...", "gold1"),
 }
+TOOL_INFO = {sys.intern(name): info for name, info in TOOL_INFO.items()}
 
 session_manager = SessionManager()
 session_ops = SessionOperations(session_manager)
+background_saver = BackgroundSaver(session_manager)
 undo_redo_manager = UndoRedoManager()
 template_applicator = TemplateApplicator()
 template_registry = TemplateRegistry()
@@ -178,33 +182,49 @@ def display_plan(plan):
     steps = plan.get("steps", [])
     completed = sum(1 for s in steps if s.get("status") == "completed")
     metadata = plan.get("metadata", {})
-    milestones = set(metadata.get("milestones", []))
+    milestones = frozenset(metadata.get("milestones", ()))
+    console_print = console.print
 
-    console.print(f"[bold]{title}[/bold] (v{version}) - {completed}/{len(steps)} done")
+    console_print(f"[bold]{title}[/bold] (v{version}) - {completed}/{len(steps)} done")
 
     if metadata.get("estimated_duration"):
-        console.print(f"[dim]Estimated: {metadata['estimated_duration']}[/dim]")
+        console_print(f"[dim]Estimated: {metadata['estimated_duration']}[/dim]")
 
-    console.print()
+    console_print()
 
     for step in steps:
+        step_id = step["id"]
         status = "✓" if step.get("status") == "completed" else "○"
-        milestone = " 🏁" if step["id"] in milestones else ""
-        due = ""
-        if "due_date" in step:
-            due_date = (
-                step["due_date"][:10]
-                if isinstance(step["due_date"], str)
-                else str(step["due_date"])[:10]
-            )
-            due = f" [dim](due {due_date})[/dim]"
+        milestone = " 🏁" if milestones and step_id in milestones else ""
+        due_date = step.get("due_date")
+        due = f" [dim](due {str(due_date)[:10]})[/dim]" if due_date is not None else ""
 
-        console.print(f"  {status} {step['id']}.{milestone} {step.get('description', '')}{due}")
+        console_print(f"  {status} {step_id}.{milestone} {step.get('description', '')}{due}")
 
-        if "sub_steps" in step:
-            for sub in step["sub_steps"]:
+        sub_steps = step.get("sub_steps")
+        if sub_steps:
+            for sub in sub_steps:
                 sub_status = "✓" if sub.get("status") == "completed" else "○"
-                console.print(f"      {sub_status} {sub['description']}")
+                console_print(f"      {sub_status} {sub['description']}")
+
+
+def _render_diff_lines(
+    diff: list[tuple[str, str, str]], width: int, modify_width: int | None = None
+) -> list[str]:
+    """Render diff entries as Rich markup lines, truncating descriptions to width."""
+    modify_width = modify_width or width
+    lines = []
+    for action, old, new in diff:
+        if action == "title":
+            lines.append(f"[yellow]Title:[/yellow] [dim]{old}[/dim] → {new}")
+        elif action == "add":
+            lines.append(f"  [green]+ {new[:width]}[/green]")
+        elif action == "remove":
+            lines.append(f"  [red]- {old[:width]}[/red]")
+        elif action == "modify":
+            lines.append(f"  [red]- {old[:modify_width]}[/red]")
+            lines.append(f"  [green]+ {new[:modify_width]}[/green]")
+    return lines
 
 
 def display_stats(plan):
@@ -240,6 +260,8 @@ def display_sessions(sessions: list[dict[str, Any]]):
         console.print("[dim]No saved sessions found.[/dim]")
         return
 
+    from rich.table import Table
+
     table = Table(title="Saved Sessions")
     table.add_column("ID", style="cyan", no_wrap=True)
     table.add_column("Title", style="green")
@@ -287,8 +309,6 @@ def display_templates():
 
 def get_input():
     """Get single line input from user with interactive menu."""
-    from completer import get_input_with_menu
-
     return get_input_with_menu()
 
 
@@ -331,60 +351,46 @@ def update_plan_agent():
             tar.extractall(tmp_dir)
 
         extracted_path = os.path.join(tmp_dir, "PlannerAgent-main")
+        requirements_path = os.path.join(extracted_path, "requirements.txt")
 
         uv_path = os.path.expanduser("~/.cargo/bin/uv")
         if not os.path.exists(uv_path):
             uv_path = os.path.expanduser("~/.local/bin/uv")
 
-        console.print("[dim]Updating files...[/dim]")
+        venv_python = os.path.join(install_path, ".venv", "bin", "python")
+        if os.path.exists(uv_path):
+            install_cmd = [uv_path, "pip", "install", "-q", "--python", venv_python]
+        else:
+            install_cmd = [venv_python, "-m", "pip", "install", "-q"]
+        install_cmd += ["-r", requirements_path]
+
         import shutil
+        import subprocess
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Dependency install only touches .venv, so it can run while files are copied
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            console.print("[dim]Updating dependencies...[/dim]")
+            install_future = executor.submit(
+                subprocess.run, install_cmd, check=True, capture_output=True
+            )
 
-        for item in os.listdir(extracted_path):
-            src = os.path.join(extracted_path, item)
-            dst = os.path.join(install_path, item)
+            console.print("[dim]Updating files...[/dim]")
+            for item in os.listdir(extracted_path):
+                src = os.path.join(extracted_path, item)
+                dst = os.path.join(install_path, item)
 
-            if item == ".venv":
-                continue
+                if item == ".venv":
+                    continue
 
-            if os.path.isdir(src):
-                if os.path.exists(dst):
-                    shutil.rmtree(dst)
-                shutil.copytree(src, dst)
-            else:
-                shutil.copy2(src, dst)
+                if os.path.isdir(src):
+                    if os.path.exists(dst):
+                        shutil.rmtree(dst)
+                    shutil.copytree(src, dst)
+                else:
+                    shutil.copy2(src, dst)
 
-        console.print("[dim]Updating dependencies...[/dim]")
-        venv_python = os.path.join(install_path, ".venv", "bin", "python")
-
-        if os.path.exists(uv_path):
-            subprocess.run(
-                [
-                    uv_path,
-                    "pip",
-                    "install",
-                    "-q",
-                    "--python",
-                    venv_python,
-                    "-r",
-                    os.path.join(install_path, "requirements.txt"),
-                ],
-                check=True,
-                capture_output=True,
-            )
-        else:
-            subprocess.run(
-                [
-                    venv_python,
-                    "-m",
-                    "pip",
-                    "install",
-                    "-q",
-                    "-r",
-                    os.path.join(install_path, "requirements.txt"),
-                ],
-                check=True,
-                capture_output=True,
-            )
+            install_future.result()
 
         shutil.rmtree(tmp_dir)
 
@@ -397,6 +403,60 @@ def update_plan_agent():
         return False
 
 
+BREATHE_DOTS = ("○", "◒", "◐", "◕", "●", "◕", "◐", "◒")
+# The 8-frame dot cycle and 6-frame pulse cycle line up every 24 frames
+ANIMATION_PERIOD = 24
+
+
+class StatusFrame:
+    """Single-line renderable with a pre-resolved style for the thinking animation."""
+
+    __slots__ = ("_segments",)
+
+    def __init__(self, text: str, style: str):
+        self._segments = (Segment(text, Style.parse(style)),)
+
+    def __rich_console__(self, console, options):
+        yield from self._segments
+
+
+@lru_cache(maxsize=1024)
+def _status_frame(display_text: str, base_color: str, frame: int) -> StatusFrame:
+    """Build (once) the animation frame for a status message."""
+    dot = BREATHE_DOTS[frame % len(BREATHE_DOTS)]
+
+    pulse_phase = frame % 6
+    if pulse_phase < 2:
+        color = f"bold {base_color}"
+    elif pulse_phase < 4:
+        color = base_color
+    else:
+        color = f"dim {base_color}"
+
+    return StatusFrame(f"{dot} {display_text}", color)
+
+
+_last_plan_hash: bytes | None = None
+
+
+def _plan_changed(plan: dict[str, Any]) -> bool:
+    """Return True if plan differs from the last plan seen, by content hash."""
+    global _last_plan_hash
+
+    payload = json.dumps(plan, sort_keys=True, default=str).encode()
+    plan_hash = hashlib.blake2b(payload, digest_size=16).digest()
+    if plan_hash == _last_plan_hash:
+        return False
+    _last_plan_hash = plan_hash
+    return True
+
+
+def _forget_last_plan() -> None:
+    """Stop comparing against the last plan seen; call whenever the session state is replaced."""
+    global _last_plan_hash
+    _last_plan_hash = None
+
+
 async def get_response(state):
     """Get response from agent and handle streaming with interrupt support."""
     current_plan = None
@@ -437,13 +497,16 @@ async def get_response(state):
                                     for tc in msg.tool_calls:
                                         tool_name = tc.get("name")
                                         if tool_name:
+                                            # Interned so TOOL_INFO lookups in the animation
+                                            # loop hit the identity fast path
+                                            tool_name = sys.intern(tool_name)
                                             shared_state["current_tool"] = tool_name
-                                            shared_state["tool_start_time"] = time.time()
+                                            shared_state["tool_start_time"] = time.monotonic()
                                             logging.info(f"Tool Call: {tool_name}")
 
                     if "current_plan" in value:
                         current_plan = value["current_plan"]
-                        if current_plan:
+                        if current_plan and _plan_changed(current_plan):
                             filepath, diff = save_plan_artifact(current_plan)
                             shared_state["last_diff"] = diff
                             console.print(f"[dim]💾 Plan saved to: {filepath}[/dim]")
@@ -468,9 +531,8 @@ async def get_response(state):
     fd = sys.stdin.fileno()
     old_settings = termios.tcgetattr(fd)
 
-    breathe_dots = ["○", "◒", "◐", "◕", "●", "◕", "◐", "◒"]
-    idx = 0
     active_tool = None
+    anim_start = time.monotonic()
 
     try:
         tty.setcbreak(fd)  # Enable non-blocking character input
@@ -508,18 +570,9 @@ async def get_response(state):
                     display_text = "Thinking... (ESC to stop)"
                     base_color = "bright_magenta"
 
-                dot = breathe_dots[idx % len(breathe_dots)]
-
-                pulse_phase = idx % 6
-                if pulse_phase < 2:
-                    color = f"bold {base_color}"
-                elif pulse_phase < 4:
-                    color = base_color
-                else:
-                    color = f"dim {base_color}"
-
-                live.update(Text(f"{dot} {display_text}", style=color))
-                idx += 1
+                # Derive the frame from elapsed time so the animation survives loop stalls
+                frame = int((time.monotonic() - anim_start) * 10)
+                live.update(_status_frame(display_text, base_color, frame % ANIMATION_PERIOD))
                 await asyncio.sleep(0.1)
     finally:
         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
@@ -543,367 +596,410 @@ async def get_response(state):
     if diff:
         has_changes = any(action != "same" for action, _, _ in diff)
         if has_changes:
-            console.print("[dim]Changes saved:[/dim]")
-            for action, old, new in diff[:10]:
-                if action == "add":
-                    console.print(f"  [green]+ {new[:60]}[/green]")
-                elif action == "remove":
-                    console.print(f"  [red]- {old[:60]}[/red]")
-                elif action == "modify":
-                    console.print(f"  [red]- {old[:50]}[/red]")
-                    console.print(f"  [green]+ {new[:50]}[/green]")
-            console.print()
+            lines = ["[dim]Changes saved:[/dim]"]
+            lines.extend(_render_diff_lines(diff[:10], width=60, modify_width=50))
+            lines.append("")
+            console.print("\n".join(lines))
 
     return current_plan, new_summary, new_messages
 
 
-def handle_command(cmd: str, arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
-    """Handle CLI commands. Returns (should_continue, new_state)."""
+def _cmd_exit(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    console.print("[dim]Goodbye! 👋 Happy planning![/dim]")
+    return False, state
 
-    if cmd == "/exit":
-        console.print("[dim]Goodbye! 👋 Happy planning![/dim]")
-        return False, state
 
-    elif cmd == "/help":
-        print_help()
-        return True, state
+def _cmd_help(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    print_help()
+    return True, state
 
-    elif cmd == "/config":
-        interactive_setup()
-        print_welcome()
-        return True, state
 
-    elif cmd == "/provider":
-        if not arg:
-            info = get_current_provider_info()
-            console.print(f"[dim]Current: {info['provider']}[/dim]")
-            return True, state
+def _cmd_config(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    interactive_setup()
+    print_welcome()
+    return True, state
 
-        parts = arg.split()
-        if switch_provider(parts[0], parts[1] if len(parts) > 1 else None):
-            console.print(f"[green]Switched to {parts[0]}[/green]")
-        else:
-            console.print("[red]Failed. Check API key.[/red]")
-        return True, state
 
-    elif cmd == "/update":
-        update_plan_agent()
+def _cmd_provider(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    if not arg:
+        info = get_current_provider_info()
+        console.print(f"[dim]Current: {info['provider']}[/dim]")
         return True, state
 
-    elif cmd == "/clear":
-        console.clear()
-        print_welcome()
-        return True, state
+    parts = arg.split()
+    if switch_provider(parts[0], parts[1] if len(parts) > 1 else None):
+        console.print(f"[green]Switched to {parts[0]}[/green]")
+    else:
+        console.print("[red]Failed. Check API key.[/red]")
+    return True, state
 
-    elif cmd == "/reset":
-        return True, create_fresh_state()
 
-    elif cmd == "/plan":
-        display_plan(state.get("current_plan"))
-        return True, state
+def _cmd_update(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    update_plan_agent()
+    return True, state
 
-    elif cmd == "/stats":
-        display_stats(state.get("current_plan"))
-        return True, state
 
-    elif cmd == "/gantt":
-        plan = state.get("current_plan")
-        if not plan:
-            console.print("[red]No plan to chart.[/red]")
-            return True, state
+def _cmd_clear(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    console.clear()
+    print_welcome()
+    return True, state
 
-        format = arg.strip() if arg else "html"
-        if format not in ["html", "svg"]:
-            console.print("[red]Usage: /gantt [html|svg][/red]")
-            return True, state
 
-        try:
-            content = export_gantt_chart(plan, format)
+def _cmd_reset(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    return True, create_fresh_state()
 
-            # Save to artifacts
-            from artifacts import sanitize_filename
 
-            base_name = sanitize_filename(plan.get("title", "plan"))
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{base_name}_gantt_{timestamp}.{format}"
-            filepath = Path("artifacts") / filename
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            filepath.write_text(content)
+def _cmd_plan(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    display_plan(state.get("current_plan"))
+    return True, state
 
-            console.print(f"[green]✓ Gantt chart exported: {filepath}[/green]")
 
-            # Try to open in browser if html
-            if format == "html":
-                import webbrowser
+def _cmd_stats(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    display_stats(state.get("current_plan"))
+    return True, state
 
-                try:
-                    webbrowser.open(f"file://{filepath.absolute()}")
-                    console.print("[dim]Opening in browser...[/dim]")
-                except Exception:
-                    pass
-        except Exception as e:
-            console.print(f"[red]Error: {e}[/red]")
+
+def _cmd_gantt(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    plan = state.get("current_plan")
+    if not plan:
+        console.print("[red]No plan to chart.[/red]")
         return True, state
 
-    elif cmd == "/":
-        display_artifacts()
+    format = arg.strip() if arg else "html"
+    if format not in ["html", "svg"]:
+        console.print("[red]Usage: /gantt [html|svg][/red]")
         return True, state
 
-    elif cmd == "/compact":
-        if arg:
-            # Compact a saved session
-            success = session_manager.compact_session(arg.strip())
-            if success:
-                new_size = session_manager.get_session_size(arg.strip())
-                console.print(f"[green]✓ Session compacted: {arg[:12]}[/green]")
-                console.print(f"[dim]New size: {new_size / 1024:.1f} KB[/dim]")
-            else:
-                console.print(f"[red]Session not found: {arg}[/red]")
+    try:
+        content = export_gantt_chart(plan, format)
+
+        # Save to artifacts
+        from datetime import datetime
+        from pathlib import Path
+
+        from artifacts import sanitize_filename
+
+        base_name = sanitize_filename(plan.get("title", "plan"))
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{base_name}_gantt_{timestamp}.{format}"
+        filepath = Path("artifacts") / filename
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_bytes(content.encode("utf-8"))
+
+        console.print(f"[green]✓ Gantt chart exported: {filepath}[/green]")
+
+        # Try to open in browser if html
+        if format == "html":
+            import webbrowser
+
+            try:
+                webbrowser.open(f"file://{filepath.absolute()}")
+                console.print("[dim]Opening in browser...[/dim]")
+            except Exception:
+                pass
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+    return True, state
+
+
+def _cmd_artifacts(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    display_artifacts()
+    return True, state
+
+
+def _cmd_compact(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    if arg:
+        # Compact a saved session
+        success = session_manager.compact_session(arg.strip())
+        if success:
+            new_size = session_manager.get_session_size(arg.strip())
+            console.print(f"[green]✓ Session compacted: {arg[:12]}[/green]")
+            console.print(f"[dim]New size: {new_size / 1024:.1f} KB[/dim]")
         else:
-            # Compact current context
-            console.print("[dim]Compacting context...[/dim]")
-            result = context_management_node(state)
-            if result.get("summary"):
-                state["summary"] = result["summary"]
-            if result.get("messages"):
-                state["messages"] = result["messages"]
-            console.print("[green]✓ Context compacted.[/green]")
+            console.print(f"[red]Session not found: {arg}[/red]")
+    else:
+        # Compact current context
+        console.print("[dim]Compacting context...[/dim]")
+        result = context_management_node(state)
+        if result.get("summary"):
+            state["summary"] = result["summary"]
+        if result.get("messages"):
+            state["messages"] = result["messages"]
+        console.print("[green]✓ Context compacted.[/green]")
+    return True, state
+
+
+def _cmd_save(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    session_id = session_manager.auto_save(state)
+    console.print(f"[green]✓ Session saved: {session_id[:12]}[/green]")
+    return True, state
+
+
+def _cmd_sessions(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    sessions = session_manager.list_sessions()
+    display_sessions(sessions)
+    return True, state
+
+
+def _cmd_resume(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    if not arg:
+        console.print("[red]Usage: /resume <session_id>[/red]")
+        sessions = session_manager.list_sessions()[:5]
+        if sessions:
+            console.print("[dim]Recent sessions:[/dim]")
+            for s in sessions:
+                console.print(f"  [cyan]{s['session_id'][:12]}[/cyan] - {s['title']}")
         return True, state
 
-    elif cmd == "/save":
-        session_id = session_manager.auto_save(state)
-        console.print(f"[green]✓ Session saved: {session_id[:12]}[/green]")
+    loaded_state = session_manager.load(arg.strip())
+    if loaded_state:
+        _forget_last_plan()
+        console.print(f"[green]✓ Resumed session: {loaded_state.get('title', arg[:12])}[/green]")
+        display_plan(loaded_state.get("current_plan"))
+        return True, loaded_state
+    else:
+        console.print(f"[red]Session not found: {arg}[/red]")
         return True, state
 
-    elif cmd == "/sessions":
-        sessions = session_manager.list_sessions()
-        display_sessions(sessions)
-        return True, state
 
-    elif cmd == "/resume":
-        if not arg:
-            console.print("[red]Usage: /resume <session_id>[/red]")
-            sessions = session_manager.list_sessions()[:5]
-            if sessions:
-                console.print("[dim]Recent sessions:[/dim]")
-                for s in sessions:
-                    console.print(f"  [cyan]{s['session_id'][:12]}[/cyan] - {s['title']}")
-            return True, state
+def _cmd_fork(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    current_session = state.get("session_id")
+    if not current_session:
+        console.print("[red]No current session to fork. Use /save first.[/red]")
+        return True, state
 
-        loaded_state = session_manager.load(arg.strip())
-        if loaded_state:
-            console.print(
-                f"[green]✓ Resumed session: {loaded_state.get('title', arg[:12])}[/green]"
-            )
-            display_plan(loaded_state.get("current_plan"))
-            return True, loaded_state
-        else:
-            console.print(f"[red]Session not found: {arg}[/red]")
-            return True, state
+    new_title = arg if arg else f"{state.get('title', 'Session')} (Copy)"
+    new_id = session_manager.fork(current_session, new_title)
+    if new_id:
+        console.print(f"[green]✓ Forked to new session: {new_id[:12]}[/green]")
+    return True, state
 
-    elif cmd == "/fork":
-        current_session = state.get("session_id")
-        if not current_session:
-            console.print("[red]No current session to fork. Use /save first.[/red]")
-            return True, state
 
-        new_title = arg if arg else f"{state.get('title', 'Session')} (Copy)"
-        new_id = session_manager.fork(current_session, new_title)
-        if new_id:
-            console.print(f"[green]✓ Forked to new session: {new_id[:12]}[/green]")
+def _cmd_search(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    if not arg:
+        console.print("[red]Usage: /search <query>[/red]")
         return True, state
 
-    elif cmd == "/search":
-        if not arg:
-            console.print("[red]Usage: /search <query>[/red]")
-            return True, state
+    results = session_manager.search(arg)
+    if results:
+        console.print(f"[green]Found {len(results)} matching sessions:[/green]")
+        display_sessions(results)
+    else:
+        console.print("[dim]No matching sessions found.[/dim]")
+    return True, state
 
-        results = session_manager.search(arg)
-        if results:
-            console.print(f"[green]Found {len(results)} matching sessions:[/green]")
-            display_sessions(results)
-        else:
-            console.print("[dim]No matching sessions found.[/dim]")
+
+def _cmd_tag(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    if not arg:
+        console.print("[red]Usage: /tag <tag1,tag2,...>[/red]")
         return True, state
 
-    elif cmd == "/tag":
-        if not arg:
-            console.print("[red]Usage: /tag <tag1,tag2,...>[/red]")
-            return True, state
+    tags = [t.strip() for t in arg.split(",")]
+    current_tags = set(state.get("tags", []))
+    current_tags.update(tags)
+    state["tags"] = list(current_tags)
 
-        tags = [t.strip() for t in arg.split(",")]
-        current_tags = set(state.get("tags", []))
-        current_tags.update(tags)
-        state["tags"] = list(current_tags)
+    if state.get("session_id"):
+        session_manager.save(state["session_id"], state, tags=list(current_tags))
 
-        if state.get("session_id"):
-            session_manager.save(state["session_id"], state, tags=list(current_tags))
+    console.print(f"[green]✓ Tags added: {', '.join(tags)}[/green]")
+    return True, state
 
-        console.print(f"[green]✓ Tags added: {', '.join(tags)}[/green]")
-        return True, state
 
-    elif cmd == "/undo":
-        previous_plan, new_state = undo_redo_manager.undo(state)
-        if previous_plan is not None:
-            state["current_plan"] = previous_plan
-            state["undo_stack"] = new_state["undo_stack"]
-            state["redo_stack"] = new_state["redo_stack"]
-            console.print("[green]✓ Undone[/green]")
-            display_plan(previous_plan)
-        else:
-            console.print("[dim]Nothing to undo[/dim]")
-        return True, state
+def _cmd_undo(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    previous_plan, stacks_state = undo_redo_manager.undo(state)
+    if previous_plan is not None:
+        state["current_plan"] = previous_plan
+        state["undo_stack"] = stacks_state["undo_stack"]
+        state["redo_stack"] = stacks_state["redo_stack"]
+        console.print("[green]✓ Undone[/green]")
+        display_plan(previous_plan)
+    else:
+        console.print("[dim]Nothing to undo[/dim]")
+    return True, state
+
+
+def _cmd_redo(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    next_plan, stacks_state = undo_redo_manager.redo(state)
+    if next_plan is not None:
+        state["current_plan"] = next_plan
+        state["undo_stack"] = stacks_state["undo_stack"]
+        state["redo_stack"] = stacks_state["redo_stack"]
+        console.print("[green]✓ Redone[/green]")
+        display_plan(next_plan)
+    else:
+        console.print("[dim]Nothing to redo[/dim]")
+    return True, state
 
-    elif cmd == "/redo":
-        next_plan, new_state = undo_redo_manager.redo(state)
-        if next_plan is not None:
-            state["current_plan"] = next_plan
-            state["undo_stack"] = new_state["undo_stack"]
-            state["redo_stack"] = new_state["redo_stack"]
-            console.print("[green]✓ Redone[/green]")
-            display_plan(next_plan)
-        else:
-            console.print("[dim]Nothing to redo[/dim]")
-        return True, state
 
-    elif cmd == "/diff":
-        """Show diff between plans. Usage: /diff [file1] [file2]"""
-        from artifacts import diff_artifacts, ARTIFACTS_DIR
-        
-        args = arg.strip().split() if arg else []
-        
-        if len(args) == 0:
-            # Show diff from last change
-            diff = shared_state.get("last_diff") if 'shared_state' in globals() else None
-            if not diff:
-                # Try to compute diff from undo stack
-                undo_stack = state.get("undo_stack", [])
-                current_plan = state.get("current_plan")
-                if undo_stack and current_plan:
-                    diff = compute_diff(undo_stack[-1], current_plan)
-                elif current_plan:
-                    console.print("[dim]No previous version to compare. This is a new plan.[/dim]")
-                    return True, state
-                else:
-                    console.print("[red]No plan to diff.[/red]")
-                    return True, state
-        elif len(args) == 1:
-            # Compare with previous version of this file
-            diff = diff_artifacts(args[0])
-            if diff is None:
-                console.print(f"[red]Could not find artifact or previous version: {args[0]}[/red]")
-                console.print(f"[dim]Artifacts are stored in: {ARTIFACTS_DIR}[/dim]")
+def _cmd_diff(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    """Show diff between plans. Usage: /diff [file1] [file2]"""
+    from artifacts import diff_artifacts, ARTIFACTS_DIR
+
+    args = arg.strip().split() if arg else []
+
+    if len(args) == 0:
+        # Show diff from last change
+        diff = shared_state.get("last_diff") if 'shared_state' in globals() else None
+        if not diff:
+            # Try to compute diff from undo stack
+            previous_plan = undo_redo_manager.peek_undo(state)
+            current_plan = state.get("current_plan")
+            if previous_plan and current_plan:
+                diff = compute_diff(previous_plan, current_plan)
+            elif current_plan:
+                console.print("[dim]No previous version to compare. This is a new plan.[/dim]")
                 return True, state
-        elif len(args) >= 2:
-            # Compare two specific files
-            diff = diff_artifacts(args[0], args[1])
-            if diff is None:
-                console.print(f"[red]Could not find one or both artifacts.[/red]")
-                console.print(f"[dim]Artifacts are stored in: {ARTIFACTS_DIR}[/dim]")
+            else:
+                console.print("[red]No plan to diff.[/red]")
                 return True, state
-        
-        has_changes = any(action != "same" for action, _, _ in diff)
-        if not has_changes:
-            console.print("[dim]No changes between versions.[/dim]")
+    elif len(args) == 1:
+        # Compare with previous version of this file
+        diff = diff_artifacts(args[0])
+        if diff is None:
+            console.print(f"[red]Could not find artifact or previous version: {args[0]}[/red]")
+            console.print(f"[dim]Artifacts are stored in: {ARTIFACTS_DIR}[/dim]")
+            return True, state
+    else:
+        # Compare two specific files
+        diff = diff_artifacts(args[0], args[1])
+        if diff is None:
+            console.print(f"[red]Could not find one or both artifacts.[/red]")
+            console.print(f"[dim]Artifacts are stored in: {ARTIFACTS_DIR}[/dim]")
             return True, state
-        
-        console.print("\n[bold]Changes:[/bold]")
-        console.print("─" * 50)
-        for action, old, new in diff:
-            if action == "title":
-                console.print(f"[yellow]Title:[/yellow] [dim]{old}[/dim] → {new}")
-            elif action == "add":
-                console.print(f"  [green]+ {new[:70]}[/green]")
-            elif action == "remove":
-                console.print(f"  [red]- {old[:70]}[/red]")
-            elif action == "modify":
-                console.print(f"  [red]- {old[:70]}[/red]")
-                console.print(f"  [green]+ {new[:70]}[/green]")
-        console.print("─" * 50 + "\n")
-        return True, state
 
-    elif cmd == "/templates":
-        display_templates()
+    has_changes = any(action != "same" for action, _, _ in diff)
+    if not has_changes:
+        console.print("[dim]No changes between versions.[/dim]")
         return True, state
 
-    elif cmd == "/use":
-        if not arg:
-            console.print("[red]Usage: /use <template_id>[/red]")
-            console.print("[dim]Use /templates to see available templates[/dim]")
-            return True, state
+    lines = ["\n[bold]Changes:[/bold]", "─" * 50]
+    lines.extend(_render_diff_lines(diff, width=70))
+    lines.append("─" * 50 + "\n")
+    console.print("\n".join(lines))
+    return True, state
 
-        template_id = arg.strip()
-        preview = template_applicator.get_template_preview(template_id)
 
-        if preview:
-            new_plan = template_applicator.apply_template(template_id)
-            state["current_plan"] = new_plan
-            console.print(f"[green]✓ Created plan from template: {preview['name']}[/green]")
-            display_plan(new_plan)
+def _cmd_templates(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    display_templates()
+    return True, state
 
-            state = undo_redo_manager.push_state(state, new_plan)
-        else:
-            console.print(f"[red]Template not found: {template_id}[/red]")
+
+def _cmd_use(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    if not arg:
+        console.print("[red]Usage: /use <template_id>[/red]")
+        console.print("[dim]Use /templates to see available templates[/dim]")
         return True, state
 
-    elif cmd == "/export":
-        plan = state.get("current_plan")
-        if not plan:
-            console.print("[red]No plan to export.[/red]")
-            return True, state
+    template_id = arg.strip()
+    preview = template_applicator.get_template_preview(template_id)
 
-        format = arg.strip() if arg else "markdown"
-        try:
-            filepath = export_plan_to_file(plan, format)
-            console.print(f"[green]✓ Exported to: {filepath}[/green]")
-        except ValueError as e:
-            console.print(f"[red]{e}[/red]")
-        return True, state
+    if preview:
+        new_plan = template_applicator.apply_template(template_id)
+        state["current_plan"] = new_plan
+        console.print(f"[green]✓ Created plan from template: {preview['name']}[/green]")
+        display_plan(new_plan)
 
-    elif cmd == "/import":
-        if not arg:
-            console.print("[red]Usage: /import <filepath>[/red]")
-            return True, state
+        state = undo_redo_manager.push_state(state, new_plan)
+    else:
+        console.print(f"[red]Template not found: {template_id}[/red]")
+    return True, state
 
-        imported = import_plan_from_file(arg.strip())
-        if imported:
-            state["current_plan"] = imported
-            console.print(f"[green]✓ Imported plan: {imported['title']}[/green]")
-            display_plan(imported)
-        else:
-            console.print(f"[red]Failed to import from: {arg}[/red]")
+
+def _cmd_export(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    plan = state.get("current_plan")
+    if not plan:
+        console.print("[red]No plan to export.[/red]")
         return True, state
 
-    elif cmd == "/multi":
-        return "multi", state
+    format = arg.strip() if arg else "markdown"
+    try:
+        filepath = export_plan_to_file(plan, format)
+        console.print(f"[green]✓ Exported to: {filepath}[/green]")
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+    return True, state
 
-    elif cmd == "/":
-        from completer import CommandCompleter
 
-        console.print("[bold]Available commands:[/bold]")
-        for cmd in CommandCompleter.COMMANDS:
-            console.print(f"  [cyan]{cmd}[/cyan]")
+def _cmd_import(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    if not arg:
+        console.print("[red]Usage: /import <filepath>[/red]")
         return True, state
 
+    imported = import_plan_from_file(arg.strip())
+    if imported:
+        state["current_plan"] = imported
+        console.print(f"[green]✓ Imported plan: {imported['title']}[/green]")
+        display_plan(imported)
     else:
-        console.print(f"[dim]Unknown command: {cmd}[/dim]")
-        return True, state
+        console.print(f"[red]Failed to import from: {arg}[/red]")
+    return True, state
+
+
+def _cmd_multi(arg: str, state: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    return "multi", state
+
+
+def _cmd_menu(arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    console.print("[bold]Available commands:[/bold]")
+    for cmd in CommandCompleter.COMMANDS:
+        console.print(f"  [cyan]{cmd}[/cyan]")
+    return True, state
+
+
+def _cmd_unknown(cmd: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    console.print(f"[dim]Unknown command: {cmd}[/dim]")
+    return True, state
+
+
+CommandHandler = Callable[[str, dict[str, Any]], tuple[bool | str, dict[str, Any]]]
+
+COMMAND_HANDLERS: dict[str, CommandHandler] = {
+    "/exit": _cmd_exit,
+    "/help": _cmd_help,
+    "/config": _cmd_config,
+    "/provider": _cmd_provider,
+    "/update": _cmd_update,
+    "/clear": _cmd_clear,
+    "/reset": _cmd_reset,
+    "/plan": _cmd_plan,
+    "/stats": _cmd_stats,
+    "/gantt": _cmd_gantt,
+    "/artifacts": _cmd_artifacts,
+    "/compact": _cmd_compact,
+    "/save": _cmd_save,
+    "/sessions": _cmd_sessions,
+    "/resume": _cmd_resume,
+    "/fork": _cmd_fork,
+    "/search": _cmd_search,
+    "/tag": _cmd_tag,
+    "/undo": _cmd_undo,
+    "/redo": _cmd_redo,
+    "/diff": _cmd_diff,
+    "/templates": _cmd_templates,
+    "/use": _cmd_use,
+    "/export": _cmd_export,
+    "/import": _cmd_import,
+    "/multi": _cmd_multi,
+    "/": _cmd_menu,
+}
+
+
+def handle_command(cmd: str, arg: str, state: dict[str, Any]) -> tuple[bool, dict[str, Any]]:
+    """Handle CLI commands. Returns (should_continue, new_state)."""
+    # Commands may read or rewrite session files, so let pending auto-saves land first
+    background_saver.flush()
+
+    handler = COMMAND_HANDLERS.get(cmd)
+    if handler is None:
+        return _cmd_unknown(cmd, state)
+    return handler(arg, state)
 
 
 def create_fresh_state() -> dict[str, Any]:
     """Create a fresh agent state."""
-    return {
-        "messages": [],
-        "summary": "",
-        "current_plan": {},
-        "conversation_turn": 0,
-        "user_preferences": {},
-        "last_action": "",
-        "session_id": "",
-        "undo_stack": [],
-        "redo_stack": [],
-        "tags": [],
-    }
+    _forget_last_plan()
+    return new_state()
 
 
 async def run_chat(resume_session_id: str | None = None):
@@ -917,6 +1013,7 @@ async def run_chat(resume_session_id: str | None = None):
     if resume_session_id:
         state = session_manager.load(resume_session_id)
         if state:
+            _forget_last_plan()
             console.print(
                 f"[green]✓ Resumed session: {state.get('title', resume_session_id[:12])}[/green]"
             )
@@ -966,12 +1063,12 @@ async def run_chat(resume_session_id: str | None = None):
                 state = undo_redo_manager.push_state(state, current_plan)
 
             turn_count += 1
-            state["messages"] = state["messages"] + [message]
+            state["messages"].append(message)
 
             new_plan, new_summary, new_messages = await get_response(state)
 
             if new_messages:
-                state["messages"] = state["messages"] + new_messages
+                state["messages"].extend(new_messages)
             if new_plan:
                 state["current_plan"] = new_plan
             if new_summary:
@@ -979,7 +1076,7 @@ async def run_chat(resume_session_id: str | None = None):
             state["conversation_turn"] = turn_count
 
             if state.get("session_id"):
-                session_manager.auto_save(state)
+                background_saver.submit(state)
 
             console.print()
             console.print()
@@ -991,9 +1088,13 @@ async def run_chat(resume_session_id: str | None = None):
             console.print(f"\n[red]Error: {e}[/red]")
             logging.error(f"Error in run_chat: {e}")
 
+    background_saver.flush()
+
 
 def main():
     """Main entry point with argument parsing."""
+    import argparse
+
     parser = argparse.ArgumentParser(description="Planning Agent CLI")
     parser.add_argument("command", nargs="?", help="Command to run (config, artifacts, sessions)")
     parser.add_argument("--resume", "-r", help="Resume a saved session by ID")
@@ -1,17 +1,26 @@
 """Session persistence and management for Planning Agent.
 
-Sessions are stored as compressed pickle files in ~/.config/plan-agent/sessions/
+Sessions are stored as zstd-compressed JSON files in ~/.config/plan-agent/sessions/
 """
 
 import gzip
+import hashlib
 import json
+import logging
+import os
 import pickle
+import threading
 import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+import orjson
 import tiktoken
+import zstandard
 from langchain_core.messages import (
     AIMessage,
     BaseMessage,
@@ -21,11 +30,41 @@ from langchain_core.messages import (
 )
 
 from config import CONFIG_DIR
+from tools import UndoRedoManager, _fast_clone_plan
 
 SESSIONS_DIR = CONFIG_DIR / "sessions"
 MAX_STORED_MESSAGES = 20
 TOKEN_LIMIT = 8000
 COMPRESSION_THRESHOLD = 0.7
+ZSTD_LEVEL = 3
+
+logger = logging.getLogger(__name__)
+
+
+def dumps_session(data: dict[str, Any]) -> bytes:
+    """Serialize session data to JSON bytes."""
+    # Template dependency maps use int keys; anything else unexpected falls back to str
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS, default=str)
+
+
+def join_json_objects(*objects: bytes) -> bytes:
+    """Join serialized JSON objects with disjoint keys into one object."""
+    members = [obj[1:-1] for obj in objects if obj != b"{}"]
+    return b"{" + b",".join(members) + b"}"
+
+
+def write_atomic(filepath: Path, payload: bytes) -> None:
+    """Write payload so readers only ever see the old or the new file contents."""
+    tmp_path = filepath.with_suffix(filepath.suffix + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
 
 class MessageSerializer:
@@ -70,10 +109,21 @@ class MessageSerializer:
 class TokenCounter:
     """Count tokens in messages."""
 
+    MESSAGE_CACHE_SIZE = 1024
+    MESSAGE_TYPES = ("human", "ai", "system", "tool")
+
     def __init__(self, model: str = "gpt-4"):
         self._encoding = self._get_encoding(model)
+        self._type_tokens = {
+            msg_type: len(self._encoding.encode_ordinary(msg_type))
+            for msg_type in self.MESSAGE_TYPES
+        }
+        # id(msg) -> (msg, content, count); holding msg keeps its id from being reused
+        self._message_cache: OrderedDict[int, tuple[BaseMessage, Any, int]] = OrderedDict()
 
-    def _get_encoding(self, model: str):
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _get_encoding(model: str):
         try:
             return tiktoken.encoding_for_model(model)
         except KeyError:
@@ -88,6 +138,8 @@ class TokenCounter:
         Returns:
             Number of tokens
         """
+        if not text:
+            return 0
         return len(self._encoding.encode(text))
 
     def count_messages(self, messages: list[BaseMessage]) -> int:
@@ -99,19 +151,57 @@ class TokenCounter:
         Returns:
             Total token count
         """
+        cache = self._message_cache
         total = 0
+        uncached = []
         for msg in messages:
-            if isinstance(msg.content, str):
-                total += self.count(msg.content)
-            total += self.count(msg.type)
+            key = id(msg)
+            entry = cache.get(key)
+            if entry is not None and entry[0] is msg and entry[1] is msg.content:
+                cache.move_to_end(key)
+                total += entry[2]
+            else:
+                uncached.append(msg)
+
+        if not uncached:
+            return total
+
+        # Encode all new message contents in one call into tiktoken
+        texts = [msg.content if isinstance(msg.content, str) else "" for msg in uncached]
+        encoded = self._encoding.encode_ordinary_batch(texts)
+
+        type_tokens = self._type_tokens
+        for msg, tokens in zip(uncached, encoded):
+            type_count = type_tokens.get(msg.type)
+            if type_count is None:
+                type_count = self.count(msg.type)
+            count = type_count + len(tokens)
+            cache[id(msg)] = (msg, msg.content, count)
+            total += count
+
+        while len(cache) > self.MESSAGE_CACHE_SIZE:
+            cache.popitem(last=False)
         return total
 
+    def invalidate_missing(self, messages: list[BaseMessage]) -> None:
+        """Drop cached counts for messages that are no longer in the conversation."""
+        live_ids = {id(msg) for msg in messages}
+        cache = self._message_cache
+        for key in [key for key in cache if key not in live_ids]:
+            del cache[key]
+
+
+@lru_cache(maxsize=1)
+def _default_token_counter() -> TokenCounter:
+    """Shared counter for compactors built without one, created on first use."""
+    return TokenCounter()
+
 
 class SessionCompactor:
     """Compact session state to reduce size."""
 
     def __init__(self, token_counter: TokenCounter | None = None):
-        self._counter = token_counter or TokenCounter()
+        self._counter = token_counter or _default_token_counter()
 
     def compact(self, state: dict[str, Any]) -> dict[str, Any]:
         """Compact session state before saving."""
@@ -127,17 +217,20 @@ class SessionCompactor:
         if len(messages) <= MAX_STORED_MESSAGES:
             return state
 
-        # Keep last N messages
-        recent_messages = messages[-MAX_STORED_MESSAGES:]
+        total_count = len(messages)
 
         # Summarize older messages
         older_messages = messages[:-MAX_STORED_MESSAGES]
         summary = self._summarize_messages(older_messages)
 
+        # Keep last N messages
+        del messages[:-MAX_STORED_MESSAGES]
+
         # Store summary separately
         state["message_summary"] = summary
-        state["messages"] = recent_messages
-        state["total_message_count"] = len(messages)
+        state["messages"] = messages
+        state["total_message_count"] = total_count
+        self._counter.invalidate_missing(messages)
 
         return state
 
@@ -157,10 +250,10 @@ class SessionCompactor:
         MAX_STACK = 10
 
         if len(state.get("undo_stack", [])) > MAX_STACK:
-            state["undo_stack"] = state["undo_stack"][-MAX_STACK:]
+            state["undo_stack"] = UndoRedoManager.trim_stack(state["undo_stack"], MAX_STACK)
 
         if len(state.get("redo_stack", [])) > MAX_STACK:
-            state["redo_stack"] = state["redo_stack"][-MAX_STACK:]
+            state["redo_stack"] = UndoRedoManager.trim_stack(state["redo_stack"], MAX_STACK)
 
         return state
 
@@ -184,18 +277,129 @@ class SessionCompactor:
         return token_count > TOKEN_LIMIT * COMPRESSION_THRESHOLD
 
 
+class SessionIndex:
+    """Sidecar index of session metadata so listing sessions skips decompression.
+
+    The file is an append-only JSONL log: each change appends one line, the last
+    line for a session wins on load, and the log is rewritten once it has grown
+    well past the number of live entries.
+    """
+
+    FILENAME = "_index.jsonl"
+    # Bump when entries gain fields so older entries are rebuilt
+    VERSION = 4
+    # Rewrite the log once it holds this many lines and twice as many as live entries
+    COMPACT_MIN_LINES = 64
+
+    def __init__(self, base_dir: Path):
+        self._path = base_dir / self.FILENAME
+        self._entries: dict[str, dict[str, Any]] | None = None
+        self._line_count = 0
+        # Set when the log holds damaged lines, so the next change rewrites it cleanly
+        self._damaged = False
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        """Get the indexed metadata for a session."""
+        with self._lock:
+            return self._load().get(session_id)
+
+    def update(self, entries: list[dict[str, Any]]) -> None:
+        """Add or replace entries by appending them to the log."""
+        if not entries:
+            return
+        with self._lock:
+            index = self._load()
+            for entry in entries:
+                index[entry["session_id"]] = entry
+            self._append(entries)
+
+    def remove(self, session_ids: list[str]) -> None:
+        """Drop entries by appending tombstones to the log."""
+        with self._lock:
+            index = self._load()
+            removed = [session_id for session_id in session_ids if index.pop(session_id, None)]
+            if removed:
+                self._append([{"session_id": sid, "deleted": True} for sid in removed])
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            entries = {}
+            line_count = 0
+            try:
+                with open(self._path, "rb") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        line_count += 1
+                        try:
+                            entry = orjson.loads(line)
+                            session_id = entry["session_id"]
+                        except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+                            # A torn or damaged line only loses that entry; it is
+                            # rebuilt from its session file on the next listing
+                            logger.warning("Ignoring unreadable session index line: %s", e)
+                            self._damaged = True
+                            continue
+                        if entry.get("deleted"):
+                            entries.pop(session_id, None)
+                        else:
+                            entries[session_id] = entry
+            except FileNotFoundError:
+                pass
+            self._entries = entries
+            self._line_count = line_count
+        return self._entries
+
+    def _append(self, entries: list[dict[str, Any]]) -> None:
+        if self._damaged:
+            # Appending after a torn last line would corrupt the new line too
+            self._compact()
+            return
+
+        with open(self._path, "ab") as f:
+            f.write(b"".join(orjson.dumps(entry) + b"\n" for entry in entries))
+        self._line_count += len(entries)
+
+        live = len(self._entries or {})
+        if self._line_count >= self.COMPACT_MIN_LINES and self._line_count > 2 * live:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the log with one line per live entry."""
+        entries = self._entries or {}
+        payload = b"".join(orjson.dumps(entry) + b"\n" for entry in entries.values())
+        write_atomic(self._path, payload)
+        self._line_count = len(entries)
+        self._damaged = False
+
+
 class SessionStorage:
     """Handles low-level session storage operations with compression."""
 
+    SUFFIX = ".json.zst"
+    LEGACY_GZIP_SUFFIX = ".json.gz"
+    LEGACY_JSON_SUFFIX = ".json"
+    LEGACY_SUFFIXES = (LEGACY_GZIP_SUFFIX, LEGACY_JSON_SUFFIX)
+
     def __init__(self, base_dir: Path = SESSIONS_DIR):
         self._base_dir = base_dir
         self._ensure_directory()
+        self._index = SessionIndex(base_dir)
 
     def _ensure_directory(self) -> None:
         self._base_dir.mkdir(parents=True, exist_ok=True)
 
     def _get_filepath(self, session_id: str) -> Path:
-        return self._base_dir / f"{session_id}.json.gz"
+        return self._base_dir / f"{session_id}{self.SUFFIX}"
+
+    def session_id_from_path(self, filepath: Path) -> str:
+        """Get the session ID a session file was saved under."""
+        name = filepath.name
+        for suffix in (self.SUFFIX, *self.LEGACY_SUFFIXES):
+            if name.endswith(suffix):
+                return name[: -len(suffix)]
+        return filepath.stem
 
     def exists(self, session_id: str) -> bool:
         """Check if a session exists.
@@ -208,32 +412,73 @@ class SessionStorage:
         """
         return self._get_filepath(session_id).exists()
 
-    def save(self, session_id: str, data: dict[str, Any]) -> None:
-        """Save session with gzip compression."""
+    def migrate_legacy(self) -> int:
+        """Rewrite sessions stored in older formats as zstd-compressed JSON.
+
+        Returns:
+            Number of sessions migrated
+        """
+        migrated = 0
+        for suffix in self.LEGACY_SUFFIXES:
+            for filepath in self._base_dir.glob(f"*{suffix}"):
+                session_id = self.session_id_from_path(filepath)
+                try:
+                    data = self._load_legacy(filepath)
+                    if data is None:
+                        continue
+                    # A session already saved in the new format is newer than its legacy copy
+                    if not self.exists(session_id):
+                        self.save(session_id, data)
+                        migrated += 1
+                    filepath.unlink(missing_ok=True)
+                except Exception as e:
+                    logger.warning("Could not migrate session file %s: %s", filepath.name, e)
+        return migrated
+
+    def save(
+        self,
+        session_id: str,
+        data: dict[str, Any],
+        serialized: bytes | None = None,
+        plan_json: str | None = None,
+    ) -> None:
+        """Save session as zstd-compressed JSON.
+
+        Callers that already serialized data (and its current_plan) can pass the
+        bytes so nothing is serialized twice.
+        """
         filepath = self._get_filepath(session_id)
 
-        # Use msgpack + gzip for efficiency
-        serialized = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
-        compressed = gzip.compress(serialized, compresslevel=6)
+        if serialized is None:
+            serialized = dumps_session(data)
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(serialized)
 
-        with open(filepath, "wb") as f:
-            f.write(compressed)
+        write_atomic(filepath, compressed)
+
+        self._index.update([self._metadata(filepath, data, plan_json)])
 
     def load(self, session_id: str) -> dict[str, Any] | None:
-        """Load session from gzip compressed file."""
-        filepath = self._get_filepath(session_id)
-        if not filepath.exists():
-            # Try old JSON format for migration
-            old_filepath = self._base_dir / f"{session_id}.json"
-            if old_filepath.exists():
-                return self._load_old_format(old_filepath)
+        """Load session from its compressed file."""
+        try:
+            return self.load_file(self._get_filepath(session_id))
+        except FileNotFoundError:
             return None
 
+    def load_file(self, filepath: Path) -> dict[str, Any]:
+        """Load session data from a session file path."""
         with open(filepath, "rb") as f:
             compressed = f.read()
 
-        serialized = gzip.decompress(compressed)
-        return pickle.loads(serialized)
+        serialized = zstandard.ZstdDecompressor().decompress(compressed)
+        return orjson.loads(serialized)
+
+    def _load_legacy(self, filepath: Path) -> dict[str, Any] | None:
+        """Load a session file written by an older version."""
+        name = filepath.name
+        if name.endswith(self.LEGACY_GZIP_SUFFIX):
+            with open(filepath, "rb") as f:
+                return pickle.loads(gzip.decompress(f.read()))
+        return self._load_old_format(filepath)
 
     def _load_old_format(self, filepath: Path) -> dict[str, Any] | None:
         """Load old JSON format and migrate."""
@@ -246,30 +491,118 @@ class SessionStorage:
     def delete(self, session_id: str) -> bool:
         """Delete a session."""
         filepath = self._get_filepath(session_id)
-        if filepath.exists():
+        try:
             filepath.unlink()
-            return True
+            deleted = True
+        except FileNotFoundError:
+            deleted = False
+        self._index.remove([session_id])
+        return deleted
+
+    def list_metadata(self) -> list[dict[str, Any]]:
+        """List metadata for every session file, newest first, without loading sessions.
 
-        # Try old format
-        old_filepath = self._base_dir / f"{session_id}.json"
-        if old_filepath.exists():
-            old_filepath.unlink()
-            return True
+        Files that are missing from the index or changed since it was written
+        are loaded once and indexed, in parallel when there are several.
+        """
+        filepaths = self.list_all()
+        entries = [self._indexed_entry(filepath) for filepath in filepaths]
+        stale = [filepath for filepath, entry in zip(filepaths, entries) if entry is None]
+
+        if stale:
+            if len(stale) > 1:
+                workers = min(len(stale), os.cpu_count() or 1)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    rebuilt = list(executor.map(self._index_file, stale))
+            else:
+                rebuilt = [self._index_file(stale[0])]
+
+            self._index.update([entry for entry in rebuilt if entry])
+            rebuilt_entries = iter(rebuilt)
+            entries = [entry or next(rebuilt_entries) for entry in entries]
+
+        return [entry for entry in entries if entry]
+
+    def _indexed_entry(self, filepath: Path) -> dict[str, Any] | None:
+        """Get the index entry for a file if it is still current."""
+        entry = self._index.get(self.session_id_from_path(filepath))
+        try:
+            if (
+                entry is None
+                or entry.get("version") != SessionIndex.VERSION
+                or entry.get("mtime_ns") != filepath.stat().st_mtime_ns
+            ):
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def _index_file(self, filepath: Path) -> dict[str, Any] | None:
+        """Load a session file and build its index entry."""
+        try:
+            data = self.load_file(filepath)
+            if not data:
+                return None
+            return self._metadata(filepath, data)
+        except Exception:
+            return None
+
+    def _metadata(
+        self,
+        filepath: Path,
+        data: dict[str, Any],
+        plan_json: str | None = None,
+    ) -> dict[str, Any]:
+        """Build the index entry for a session file."""
+        stat = filepath.stat()
+        return {
+            "session_id": data.get("session_id", self.session_id_from_path(filepath)),
+            "title": data.get("title", "Untitled"),
+            "created_at": data.get("created_at", "Unknown"),
+            "updated_at": data.get("updated_at", "Unknown"),
+            "tags": data.get("tags", []),
+            "message_count": data.get("total_message_count", len(data.get("messages", []))),
+            "has_plan": bool(data.get("current_plan", {}).get("steps", [])),
+            "size_bytes": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "version": SessionIndex.VERSION,
+            "search": self._search_fields(data, plan_json),
+        }
 
-        return False
+    @staticmethod
+    def _search_fields(data: dict[str, Any], plan_json: str | None = None) -> dict[str, Any]:
+        """Lowercase searchable text once so searching never opens the session files.
+
+        Title, tags, plan and message summary are stored as one newline-separated
+        blob, so a non-matching session is ruled out with one check, along with the
+        offsets where each field starts so a match can still be attributed.
+        """
+        title = data.get("title", "").lower()
+        tags = "\n".join(tag.lower() for tag in data.get("tags", []))
+        if plan_json is None:
+            plan_json = dumps_session(data.get("current_plan", {})).decode()
+        plan = plan_json.lower()
+        tags_start = len(title) + 1
+        plan_start = tags_start + len(tags) + 1
+        summary_start = plan_start + len(plan) + 1
+        return {
+            "blob": "\n".join([title, tags, plan, data.get("message_summary", "").lower()]),
+            "tags_start": tags_start,
+            "plan_start": plan_start,
+            "summary_start": summary_start,
+        }
 
     def list_all(self) -> list[Path]:
         """List all session files."""
-        sessions = list(self._base_dir.glob("*.json.gz"))
-        sessions.extend(self._base_dir.glob("*.json"))  # Include old format
+        sessions = self._base_dir.glob(f"*{self.SUFFIX}")
         return sorted(sessions, key=lambda p: p.stat().st_mtime, reverse=True)
 
     def get_size(self, session_id: str) -> int:
         """Get file size in bytes."""
-        filepath = self._get_filepath(session_id)
-        if filepath.exists():
-            return filepath.stat().st_size
-        return 0
+        try:
+            return self._get_filepath(session_id).stat().st_size
+        except FileNotFoundError:
+            return 0
 
 
 class SessionManager:
@@ -282,8 +615,11 @@ class SessionManager:
         compactor: SessionCompactor | None = None,
     ):
         self._storage = storage or SessionStorage()
+        self._storage.migrate_legacy()
         self._serializer = serializer or MessageSerializer()
         self._compactor = compactor or SessionCompactor()
+        # session_id -> fingerprint of the last content written for it
+        self._saved_fingerprints: dict[str, bytes] = {}
 
     def save(
         self,
@@ -291,11 +627,14 @@ class SessionManager:
         state: dict[str, Any],
         title: str | None = None,
         tags: list[str] | None = None,
+        compact: bool = True,
     ) -> str:
-        """Save a conversation session to disk with automatic compaction."""
-        # Check if compaction needed
-        if self._compactor.should_compact(state):
-            state = self._compactor.compact(state)
+        """Save a conversation session to disk with automatic compaction.
+
+        Pass compact=False when the caller has already run compact_if_needed.
+        """
+        if compact:
+            state = self.compact_if_needed(state)
 
         timestamp = datetime.now().isoformat()
 
@@ -316,14 +655,43 @@ class SessionManager:
             "conversation_turn": state.get("conversation_turn", 0),
             "user_preferences": state.get("user_preferences", {}),
             "last_action": state.get("last_action", ""),
-            "undo_stack": state.get("undo_stack", []),
-            "redo_stack": state.get("redo_stack", []),
-            "version": 2,  # Session format version
+            "undo_stack": list(state.get("undo_stack", ())),
+            "redo_stack": list(state.get("redo_stack", ())),
+            "version": 4,  # Session format version
         }
 
-        self._storage.save(session_id, session_data)
+        # Serialize everything once: the plan on its own (it doubles as search text),
+        # the rest without timestamps (so it can be fingerprinted), then the timestamps
+        plan_bytes = dumps_session(session_data["current_plan"])
+        content_bytes = dumps_session(
+            {
+                key: value
+                for key, value in session_data.items()
+                if key not in ("created_at", "updated_at", "current_plan")
+            }
+        )
+
+        # Skip the write when nothing but the timestamps changed since the last save
+        fingerprint = hashlib.blake2b(content_bytes + plan_bytes, digest_size=16).digest()
+        unchanged = self._saved_fingerprints.get(session_id) == fingerprint
+        if unchanged and self._storage.exists(session_id):
+            return session_id
+
+        serialized = join_json_objects(
+            dumps_session({"created_at": session_data["created_at"], "updated_at": timestamp}),
+            content_bytes,
+            b'{"current_plan":' + plan_bytes + b"}",
+        )
+        self._storage.save(session_id, session_data, serialized, plan_bytes.decode())
+        self._saved_fingerprints[session_id] = fingerprint
         return session_id
 
+    def compact_if_needed(self, state: dict[str, Any]) -> dict[str, Any]:
+        """Compact state in place when its messages exceed the token budget."""
+        if self._compactor.should_compact(state):
+            state = self._compactor.compact(state)
+        return state
+
     def load(self, session_id: str) -> dict[str, Any] | None:
         """Load a conversation session from disk."""
         session_data = self._storage.load(session_id)
@@ -342,8 +710,8 @@ class SessionManager:
             "conversation_turn": session_data.get("conversation_turn", 0),
             "user_preferences": session_data.get("user_preferences", {}),
             "last_action": session_data.get("last_action", ""),
-            "undo_stack": session_data.get("undo_stack", []),
-            "redo_stack": session_data.get("redo_stack", []),
+            "undo_stack": deque(session_data.get("undo_stack", ())),
+            "redo_stack": deque(session_data.get("redo_stack", ())),
             "created_at": session_data.get("created_at"),
             "updated_at": session_data.get("updated_at"),
             "session_id": session_id,
@@ -373,46 +741,32 @@ class SessionManager:
         """List all saved sessions with optional tag filtering."""
         sessions = []
 
-        for filepath in self._storage.list_all():
-            try:
-                if filepath.suffix == ".gz":
-                    data = self._storage.load(filepath.stem.replace(".json", ""))
-                else:
-                    with open(filepath) as f:
-                        data = json.load(f)
-
-                if not data:
+        for entry in self._storage.list_metadata():
+            if tags:
+                session_tags = set(entry["tags"])
+                if not any(tag in session_tags for tag in tags):
                     continue
 
-                if tags:
-                    session_tags = set(data.get("tags", []))
-                    if not any(tag in session_tags for tag in tags):
-                        continue
-
-                file_size = filepath.stat().st_size
-
-                sessions.append(
-                    {
-                        "session_id": data.get("session_id", filepath.stem.replace(".json", "")),
-                        "title": data.get("title", "Untitled"),
-                        "created_at": data.get("created_at", "Unknown"),
-                        "updated_at": data.get("updated_at", "Unknown"),
-                        "tags": data.get("tags", []),
-                        "message_count": data.get(
-                            "total_message_count", len(data.get("messages", []))
-                        ),
-                        "has_plan": bool(data.get("current_plan", {}).get("steps", [])),
-                        "size_bytes": file_size,
-                        "size_kb": round(file_size / 1024, 1),
-                    }
-                )
-            except Exception:
-                continue
+            file_size = entry["size_bytes"]
+            sessions.append(
+                {
+                    "session_id": entry["session_id"],
+                    "title": entry["title"],
+                    "created_at": entry["created_at"],
+                    "updated_at": entry["updated_at"],
+                    "tags": entry["tags"],
+                    "message_count": entry["message_count"],
+                    "has_plan": entry["has_plan"],
+                    "size_bytes": file_size,
+                    "size_kb": round(file_size / 1024, 1),
+                }
+            )
 
         return sessions
 
     def delete(self, session_id: str) -> bool:
         """Delete a session by ID."""
+        self._saved_fingerprints.pop(session_id, None)
         return self._storage.delete(session_id)
 
     def search(self, query: str) -> list[dict[str, Any]]:
@@ -420,58 +774,50 @@ class SessionManager:
         query_lower = query.lower()
         matches = []
 
-        for filepath in self._storage.list_all():
-            try:
-                if filepath.suffix == ".gz":
-                    data = self._storage.load(filepath.stem.replace(".json", ""))
-                else:
-                    with open(filepath) as f:
-                        data = json.load(f)
-
-                if not data:
-                    continue
-
-                match_reason = self._get_match_reason(data, query_lower)
-                if match_reason:
-                    file_size = filepath.stat().st_size
-                    matches.append(
-                        {
-                            "session_id": data.get(
-                                "session_id", filepath.stem.replace(".json", "")
-                            ),
-                            "title": data.get("title", "Untitled"),
-                            "updated_at": data.get("updated_at", "Unknown"),
-                            "tags": data.get("tags", []),
-                            "match_reason": match_reason,
-                            "size_kb": round(file_size / 1024, 1),
-                        }
-                    )
-            except Exception:
-                continue
+        for entry in self._storage.list_metadata():
+            match_reason = self._get_match_reason(entry["search"], query_lower)
+            if match_reason:
+                matches.append(
+                    {
+                        "session_id": entry["session_id"],
+                        "title": entry["title"],
+                        "updated_at": entry["updated_at"],
+                        "tags": entry["tags"],
+                        "match_reason": match_reason,
+                        "size_kb": round(entry["size_bytes"] / 1024, 1),
+                    }
+                )
 
         return sorted(matches, key=lambda x: x["updated_at"], reverse=True)
 
-    def _get_match_reason(self, data: dict[str, Any], query_lower: str) -> str | None:
-        """Determine why a session matches a query."""
-        if query_lower in data.get("title", "").lower():
+    def _get_match_reason(self, search: dict[str, Any], query_lower: str) -> str | None:
+        """Determine why a session matches a query, given its lowercased search fields."""
+        blob = search["blob"]
+        if query_lower not in blob:
+            return None
+
+        # Search each field in place; fields are newline-separated, so a query without
+        # a newline cannot match across two of them
+        tags_start, plan_start, summary_start = (
+            search["tags_start"],
+            search["plan_start"],
+            search["summary_start"],
+        )
+        if blob.find(query_lower, 0, tags_start - 1) != -1:
             return "title"
 
-        tags = data.get("tags", [])
-        if any(query_lower in tag.lower() for tag in tags):
+        if blob.find(query_lower, tags_start, plan_start - 1) != -1:
             return "tag"
 
-        plan = data.get("current_plan", {})
-        plan_text = json.dumps(plan).lower()
-        if query_lower in plan_text:
+        if blob.find(query_lower, plan_start, summary_start - 1) != -1:
             return "plan content"
 
-        summary = data.get("message_summary", "")
-        if query_lower in summary.lower():
+        if blob.find(query_lower, summary_start) != -1:
             return "message summary"
 
         return None
 
-    def auto_save(self, state: dict[str, Any]) -> str:
+    def auto_save(self, state: dict[str, Any], compact: bool = True) -> str:
         """Auto-save current session if it has a session_id."""
         session_id = state.get("session_id")
         if not session_id:
@@ -483,7 +829,7 @@ class SessionManager:
         if state.get("current_plan"):
             title = state["current_plan"].get("title")
 
-        self.save(session_id, state, title=title)
+        self.save(session_id, state, title=title, compact=compact)
         return session_id
 
     def fork(self, session_id: str, new_title: str | None = None) -> str | None:
@@ -496,8 +842,8 @@ class SessionManager:
         state["session_id"] = new_id
         state["conversation_turn"] = 0
         state["title"] = new_title or f"{state.get('title', 'Fork')} (Copy)"
-        state["undo_stack"] = []
-        state["redo_stack"] = []
+        state["undo_stack"] = deque()
+        state["redo_stack"] = deque()
         state["message_summary"] = ""
         state["total_message_count"] = len(state.get("messages", []))
 
@@ -510,6 +856,60 @@ class SessionManager:
         return str(uuid.uuid4())[:12]
 
 
+class BackgroundSaver:
+    """Runs auto-saves on a worker thread so disk I/O stays off the chat loop.
+
+    Only the newest state is kept while a save is waiting to run, so a burst of
+    submissions results in a single write.
+    """
+
+    def __init__(self, manager: SessionManager | None = None):
+        self._manager = manager or SessionManager()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-save")
+        self._lock = threading.Lock()
+        self._pending: dict[str, Any] | None = None
+        self._future: Future | None = None
+
+    def submit(self, state: dict[str, Any]) -> None:
+        """Queue state to be auto-saved in the background.
+
+        Compaction runs here on the calling thread so it trims the live state, and
+        the worker only ever sees a snapshot the chat loop can no longer mutate.
+        """
+        state = self._manager.compact_if_needed(state)
+        snapshot = {
+            **state,
+            "messages": list(state.get("messages", [])),
+            "current_plan": _fast_clone_plan(state.get("current_plan", {})),
+            "undo_stack": deque(state.get("undo_stack", ())),
+            "redo_stack": deque(state.get("redo_stack", ())),
+        }
+
+        with self._lock:
+            already_queued = self._pending is not None
+            self._pending = snapshot
+            if not already_queued:
+                self._future = self._executor.submit(self._run_pending)
+
+    def _run_pending(self) -> None:
+        with self._lock:
+            state, self._pending = self._pending, None
+
+        if state is None:
+            return
+
+        try:
+            self._manager.auto_save(state, compact=False)
+        except Exception as e:
+            logger.error("Background session save failed: %s", e)
+
+    def flush(self) -> None:
+        """Block until every submitted save has been written."""
+        future = self._future
+        if future is not None:
+            future.result()
+
+
 class SessionOperations:
     """High-level session operations for CLI integration."""
 
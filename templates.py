@@ -1,10 +1,39 @@
 """Plan templates for common scenarios."""
 
-from dataclasses import dataclass, field
-from typing import Any
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import InitVar, dataclass, field
+from datetime import datetime
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Any, Mapping, Sequence
 
+# Every template step starts out pending
+_PENDING = "pending"
 
-@dataclass
+_TOKEN_SPLIT = re.compile(r"\W+")
+_WORD = re.compile(r"\w+")
+
+# (unix second, ISO timestamp taken during that second)
+_timestamp_cache: tuple[int, str] = (0, "")
+
+
+def _current_timestamp(precise: bool = False) -> str:
+    """Get an ISO timestamp, reusing the one already formatted this second."""
+    global _timestamp_cache
+
+    if precise:
+        return datetime.now().isoformat()
+
+    second = int(time.time())
+    if _timestamp_cache[0] != second:
+        _timestamp_cache = (second, datetime.now().isoformat())
+    return _timestamp_cache[1]
+
+
+@dataclass(frozen=True, slots=True)
 class PlanTemplate:
     """A reusable plan template."""
 
@@ -12,606 +41,162 @@ class PlanTemplate:
     name: str
     description: str
     category: str
-    steps: list[dict[str, Any]]
+    steps: tuple[tuple[int, str], ...]
     estimated_duration: str | None = None
-    tags: list[str] = field(default_factory=list)
-    dependencies: dict[int, list[int]] = field(default_factory=dict)
-    milestones: list[int] = field(default_factory=list)
-
-
-class TemplateRegistry:
-    """Registry of available plan templates."""
-
-    def __init__(self):
-        self._templates: dict[str, PlanTemplate] = {}
-        self._register_default_templates()
+    tags: tuple[str, ...] = ()
+    # Step ID -> prerequisite step IDs; only kept in the flat form below
+    dependencies: InitVar[Mapping[int, Sequence[int]] | None] = None
+    milestones: tuple[int, ...] = ()
+    # Dependencies in CSR form: prerequisites of _dep_keys[i] are
+    # _dep_targets[_dep_offsets[i]:_dep_offsets[i + 1]]
+    _dep_keys: tuple[int, ...] = field(init=False, repr=False)
+    _dep_offsets: tuple[int, ...] = field(init=False, repr=False)
+    _dep_targets: tuple[int, ...] = field(init=False, repr=False)
+    # Lowercased copies for searching, computed once per template
+    _name_lower: str = field(init=False, repr=False, compare=False)
+    _description_lower: str = field(init=False, repr=False, compare=False)
+    _tags_lower: tuple[str, ...] = field(init=False, repr=False, compare=False)
+    # Parts of an applied plan that never vary, built once and copied per plan
+    _skeleton: Mapping[str, Any] = field(init=False, repr=False, compare=False)
+    # Read-only view of the plan this template creates, shared by all previews
+    _preview_plan: Mapping[str, Any] = field(init=False, repr=False, compare=False)
+    # Read-only summary returned by TemplateApplicator.get_template_preview
+    _summary: Mapping[str, Any] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self, dependencies: Mapping[int, Sequence[int]] | None) -> None:
+        # Templates are frozen, so derived fields are set through object.__setattr__
+        dep_keys = tuple(sorted(dependencies or ()))
+        dep_offsets = [0]
+        dep_targets: list[int] = []
+        for step_id in dep_keys:
+            dep_targets.extend(dependencies[step_id])
+            dep_offsets.append(len(dep_targets))
+
+        skeleton = {
+            "steps": tuple(
+                MappingProxyType({"id": step_id, "description": description, "status": _PENDING})
+                for step_id, description in self.steps
+            ),
+            "metadata": MappingProxyType(
+                {
+                    "total_steps": len(self.steps),
+                    "completed_steps": 0,
+                    "status": "draft",
+                    "template_id": self.id,
+                    "estimated_duration": self.estimated_duration,
+                }
+            ),
+        }
 
-    def _register_default_templates(self) -> None:
-        """Register built-in templates."""
-        templates = [
-            self._create_trip_template(),
-            self._create_event_template(),
-            self._create_website_template(),
-            self._create_mobile_app_template(),
-            self._create_product_launch_template(),
-            self._create_wedding_template(),
-            self._create_job_hunt_template(),
-            self._create_content_creation_template(),
-            self._create_home_renovation_template(),
-            self._create_study_plan_template(),
-            self._create_business_plan_template(),
-            self._create_fitness_goal_template(),
-        ]
-
-        for template in templates:
-            self._templates[template.id] = template
-
-    def _create_trip_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="trip",
-            name="Trip Planning",
-            description="Plan a complete trip with destinations, bookings, and activities",
-            category="travel",
-            estimated_duration="2-8 weeks",
-            tags=["travel", "vacation", "planning"],
-            steps=[
-                {
-                    "id": 1,
-                    "description": "Choose destination and travel dates",
-                    "status": "pending",
-                },
-                {
-                    "id": 2,
-                    "description": "Research visa and entry requirements",
-                    "status": "pending",
-                },
-                {"id": 3, "description": "Book flights or transportation", "status": "pending"},
-                {"id": 4, "description": "Book accommodation", "status": "pending"},
-                {
-                    "id": 5,
-                    "description": "Create itinerary with key attractions",
-                    "status": "pending",
-                },
-                {"id": 6, "description": "Arrange travel insurance", "status": "pending"},
-                {"id": 7, "description": "Prepare packing list and documents", "status": "pending"},
-                {"id": 8, "description": "Set up local currency and payments", "status": "pending"},
-                {
-                    "id": 9,
-                    "description": "Book restaurant reservations if needed",
-                    "status": "pending",
-                },
-                {
-                    "id": 10,
-                    "description": "Final check-in and departure preparation",
-                    "status": "pending",
-                },
-            ],
-            milestones=[3, 4, 7],
+        object.__setattr__(self, "_dep_keys", dep_keys)
+        object.__setattr__(self, "_dep_offsets", tuple(dep_offsets))
+        object.__setattr__(self, "_dep_targets", tuple(dep_targets))
+        object.__setattr__(self, "_name_lower", self.name.lower())
+        object.__setattr__(self, "_description_lower", self.description.lower())
+        object.__setattr__(self, "_tags_lower", tuple(tag.lower() for tag in self.tags))
+        object.__setattr__(self, "_skeleton", MappingProxyType(skeleton))
+        object.__setattr__(
+            self,
+            "_preview_plan",
+            MappingProxyType(
+                {
+                    "title": self.name,
+                    "steps": skeleton["steps"],
+                    "version": 1,
+                    "metadata": skeleton["metadata"],
+                }
+            ),
         )
-
-    def _create_event_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="event",
-            name="Event Planning",
-            description="Organize an event from concept to execution",
-            category="events",
-            estimated_duration="4-12 weeks",
-            tags=["event", "party", "organization"],
-            steps=[
-                {"id": 1, "description": "Define event purpose and goals", "status": "pending"},
-                {"id": 2, "description": "Set budget and allocate resources", "status": "pending"},
-                {"id": 3, "description": "Choose date and venue", "status": "pending"},
-                {
-                    "id": 4,
-                    "description": "Create guest list and send invitations",
-                    "status": "pending",
-                },
-                {"id": 5, "description": "Arrange catering and menu", "status": "pending"},
-                {"id": 6, "description": "Plan entertainment and activities", "status": "pending"},
-                {"id": 7, "description": "Coordinate decorations and theme", "status": "pending"},
-                {"id": 8, "description": "Arrange transportation if needed", "status": "pending"},
-                {
-                    "id": 9,
-                    "description": "Prepare event schedule and timeline",
-                    "status": "pending",
-                },
-                {
-                    "id": 10,
-                    "description": "Execute event and handle day-of logistics",
-                    "status": "pending",
-                },
-                {"id": 11, "description": "Follow-up and gather feedback", "status": "pending"},
-            ],
-            milestones=[3, 4, 10],
+        object.__setattr__(
+            self,
+            "_summary",
+            MappingProxyType(
+                {
+                    "id": self.id,
+                    "name": self.name,
+                    "description": self.description,
+                    "category": self.category,
+                    "estimated_duration": self.estimated_duration,
+                    "step_count": len(self.steps),
+                    "tags": self.tags,
+                    "has_dependencies": bool(dep_keys),
+                    "has_milestones": bool(self.milestones),
+                }
+            ),
         )
 
-    def _create_website_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="website",
-            name="Website Development",
-            description="Build a complete website from design to deployment",
-            category="development",
-            estimated_duration="4-8 weeks",
-            tags=["web", "development", "coding"],
-            steps=[
-                {
-                    "id": 1,
-                    "description": "Define website goals and target audience",
-                    "status": "pending",
-                },
-                {
-                    "id": 2,
-                    "description": "Create sitemap and content structure",
-                    "status": "pending",
-                },
-                {"id": 3, "description": "Design wireframes and mockups", "status": "pending"},
-                {
-                    "id": 4,
-                    "description": "Choose technology stack and hosting",
-                    "status": "pending",
-                },
-                {"id": 5, "description": "Develop frontend UI components", "status": "pending"},
-                {"id": 6, "description": "Develop backend and database", "status": "pending"},
-                {"id": 7, "description": "Create and populate content", "status": "pending"},
-                {"id": 8, "description": "Implement SEO and analytics", "status": "pending"},
-                {
-                    "id": 9,
-                    "description": "Test functionality and responsiveness",
-                    "status": "pending",
-                },
-                {"id": 10, "description": "Deploy to production", "status": "pending"},
-                {"id": 11, "description": "Post-launch monitoring and fixes", "status": "pending"},
-            ],
-            milestones=[3, 6, 10],
-            dependencies={5: [4], 6: [4], 9: [5, 6, 7]},
-        )
+    @property
+    def has_dependencies(self) -> bool:
+        """Whether any step depends on another."""
+        return bool(self._dep_keys)
 
-    def _create_mobile_app_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="mobile_app",
-            name="Mobile App Development",
-            description="Build a mobile application for iOS and Android",
-            category="development",
-            estimated_duration="8-16 weeks",
-            tags=["mobile", "app", "development"],
-            steps=[
-                {
-                    "id": 1,
-                    "description": "Define app concept and unique value proposition",
-                    "status": "pending",
-                },
-                {
-                    "id": 2,
-                    "description": "Research competitors and market fit",
-                    "status": "pending",
-                },
-                {
-                    "id": 3,
-                    "description": "Create user personas and user stories",
-                    "status": "pending",
-                },
-                {
-                    "id": 4,
-                    "description": "Design app architecture and tech stack",
-                    "status": "pending",
-                },
-                {
-                    "id": 5,
-                    "description": "Create wireframes and UI/UX designs",
-                    "status": "pending",
-                },
-                {
-                    "id": 6,
-                    "description": "Set up development environment and CI/CD",
-                    "status": "pending",
-                },
-                {"id": 7, "description": "Develop core features (MVP)", "status": "pending"},
-                {
-                    "id": 8,
-                    "description": "Implement authentication and security",
-                    "status": "pending",
-                },
-                {"id": 9, "description": "Build backend API and database", "status": "pending"},
-                {"id": 10, "description": "Integrate third-party services", "status": "pending"},
-                {"id": 11, "description": "Conduct internal testing and QA", "status": "pending"},
-                {"id": 12, "description": "Beta testing with users", "status": "pending"},
-                {"id": 13, "description": "Prepare app store listings", "status": "pending"},
-                {
-                    "id": 14,
-                    "description": "Submit to App Store and Play Store",
-                    "status": "pending",
-                },
-                {"id": 15, "description": "Launch and monitor metrics", "status": "pending"},
-            ],
-            milestones=[5, 7, 12, 14],
-            dependencies={7: [4, 5], 8: [7], 9: [4], 10: [7, 9], 11: [7, 8, 10]},
-        )
+    def deps_of(self, step_id: int) -> tuple[int, ...]:
+        """Get the prerequisite step IDs of a step."""
+        i = bisect_left(self._dep_keys, step_id)
+        if i == len(self._dep_keys) or self._dep_keys[i] != step_id:
+            return ()
+        return self._dep_targets[self._dep_offsets[i] : self._dep_offsets[i + 1]]
 
-    def _create_product_launch_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="product_launch",
-            name="Product Launch",
-            description="Launch a new product with marketing and sales strategy",
-            category="business",
-            estimated_duration="6-12 weeks",
-            tags=["product", "launch", "marketing"],
-            steps=[
-                {
-                    "id": 1,
-                    "description": "Finalize product specifications and pricing",
-                    "status": "pending",
-                },
-                {
-                    "id": 2,
-                    "description": "Define target market and positioning",
-                    "status": "pending",
-                },
-                {
-                    "id": 3,
-                    "description": "Create marketing strategy and messaging",
-                    "status": "pending",
-                },
-                {
-                    "id": 4,
-                    "description": "Develop sales materials and presentations",
-                    "status": "pending",
-                },
-                {"id": 5, "description": "Set up distribution channels", "status": "pending"},
-                {
-                    "id": 6,
-                    "description": "Create launch website and landing pages",
-                    "status": "pending",
-                },
-                {"id": 7, "description": "Plan launch event or announcement", "status": "pending"},
-                {
-                    "id": 8,
-                    "description": "Prepare press releases and media kit",
-                    "status": "pending",
-                },
-                {
-                    "id": 9,
-                    "description": "Coordinate with influencers and partners",
-                    "status": "pending",
-                },
-                {"id": 10, "description": "Set up customer support processes", "status": "pending"},
-                {"id": 11, "description": "Execute launch campaign", "status": "pending"},
-                {
-                    "id": 12,
-                    "description": "Monitor results and gather feedback",
-                    "status": "pending",
-                },
-            ],
-            milestones=[3, 6, 11],
-        )
+    def dependency_map(self) -> dict[int, list[int]]:
+        """Build a mutable step ID -> prerequisites mapping."""
+        return {step_id: list(self.deps_of(step_id)) for step_id in self._dep_keys}
 
-    def _create_wedding_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="wedding",
-            name="Wedding Planning",
-            description="Plan a wedding ceremony and reception",
-            category="events",
-            estimated_duration="6-18 months",
-            tags=["wedding", "marriage", "celebration"],
-            steps=[
-                {"id": 1, "description": "Set overall budget and priorities", "status": "pending"},
-                {"id": 2, "description": "Create preliminary guest list", "status": "pending"},
-                {"id": 3, "description": "Choose wedding date and season", "status": "pending"},
-                {"id": 4, "description": "Book ceremony and reception venues", "status": "pending"},
-                {
-                    "id": 5,
-                    "description": "Hire wedding planner or coordinator",
-                    "status": "pending",
-                },
-                {"id": 6, "description": "Book photographer and videographer", "status": "pending"},
-                {"id": 7, "description": "Book caterer and finalize menu", "status": "pending"},
-                {"id": 8, "description": "Order wedding dress and attire", "status": "pending"},
-                {
-                    "id": 9,
-                    "description": "Book florist and choose decorations",
-                    "status": "pending",
-                },
-                {"id": 10, "description": "Arrange transportation", "status": "pending"},
-                {"id": 11, "description": "Book officiant or ceremony leader", "status": "pending"},
-                {"id": 12, "description": "Send save-the-dates", "status": "pending"},
-                {"id": 13, "description": "Book entertainment (DJ/band)", "status": "pending"},
-                {"id": 14, "description": "Plan honeymoon", "status": "pending"},
-                {"id": 15, "description": "Send formal invitations", "status": "pending"},
-                {
-                    "id": 16,
-                    "description": "Finalize ceremony details and vows",
-                    "status": "pending",
-                },
-                {
-                    "id": 17,
-                    "description": "Rehearsal dinner and final walkthrough",
-                    "status": "pending",
-                },
-                {"id": 18, "description": "Wedding day execution", "status": "pending"},
-            ],
-            milestones=[4, 8, 12, 15, 18],
-        )
-
-    def _create_job_hunt_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="job_hunt",
-            name="Job Search",
-            description="Organized approach to finding a new job",
-            category="career",
-            estimated_duration="4-16 weeks",
-            tags=["career", "job", "employment"],
-            steps=[
-                {"id": 1, "description": "Update resume and LinkedIn profile", "status": "pending"},
-                {"id": 2, "description": "Define target roles and companies", "status": "pending"},
-                {
-                    "id": 3,
-                    "description": "Research salary ranges and market rates",
-                    "status": "pending",
-                },
-                {"id": 4, "description": "Create cover letter templates", "status": "pending"},
-                {
-                    "id": 5,
-                    "description": "Set up job alerts on major platforms",
-                    "status": "pending",
-                },
-                {"id": 6, "description": "Apply to 5-10 positions per week", "status": "pending"},
-                {
-                    "id": 7,
-                    "description": "Network and request informational interviews",
-                    "status": "pending",
-                },
-                {
-                    "id": 8,
-                    "description": "Prepare for common interview questions",
-                    "status": "pending",
-                },
-                {"id": 9, "description": "Practice technical assessments", "status": "pending"},
-                {"id": 10, "description": "Follow up on applications", "status": "pending"},
-                {"id": 11, "description": "Attend interviews and debrief", "status": "pending"},
-                {
-                    "id": 12,
-                    "description": "Evaluate offers and negotiate terms",
-                    "status": "pending",
-                },
-                {
-                    "id": 13,
-                    "description": "Accept offer and prepare for transition",
-                    "status": "pending",
-                },
-            ],
-            milestones=[2, 6, 12],
-        )
 
-    def _create_content_creation_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="content_creation",
-            name="Content Creation Series",
-            description="Plan and execute a content series (blog, video, podcast)",
-            category="creative",
-            estimated_duration="4-8 weeks",
-            tags=["content", "creative", "media"],
-            steps=[
-                {"id": 1, "description": "Define content niche and audience", "status": "pending"},
-                {
-                    "id": 2,
-                    "description": "Research trending topics and keywords",
-                    "status": "pending",
-                },
-                {
-                    "id": 3,
-                    "description": "Create content calendar with topics",
-                    "status": "pending",
-                },
-                {
-                    "id": 4,
-                    "description": "Set up necessary equipment and tools",
-                    "status": "pending",
-                },
-                {"id": 5, "description": "Produce first batch of content", "status": "pending"},
-                {"id": 6, "description": "Edit and polish content", "status": "pending"},
-                {
-                    "id": 7,
-                    "description": "Create thumbnails and promotional assets",
-                    "status": "pending",
-                },
-                {"id": 8, "description": "Schedule and publish content", "status": "pending"},
-                {"id": 9, "description": "Promote on social media channels", "status": "pending"},
-                {
-                    "id": 10,
-                    "description": "Engage with audience and respond to comments",
-                    "status": "pending",
-                },
-                {"id": 11, "description": "Analyze performance metrics", "status": "pending"},
-                {
-                    "id": 12,
-                    "description": "Iterate based on feedback and data",
-                    "status": "pending",
-                },
-            ],
-            milestones=[3, 6, 8],
-        )
+class TemplateRegistry:
+    """Registry of available plan templates."""
 
-    def _create_home_renovation_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="home_renovation",
-            name="Home Renovation Project",
-            description="Plan a home renovation from design to completion",
-            category="home",
-            estimated_duration="8-24 weeks",
-            tags=["home", "renovation", "construction"],
-            steps=[
-                {"id": 1, "description": "Define renovation scope and goals", "status": "pending"},
-                {"id": 2, "description": "Set budget including contingency", "status": "pending"},
-                {
-                    "id": 3,
-                    "description": "Research and hire architect/designer",
-                    "status": "pending",
-                },
-                {
-                    "id": 4,
-                    "description": "Create design plans and 3D renderings",
-                    "status": "pending",
-                },
-                {"id": 5, "description": "Obtain necessary permits", "status": "pending"},
-                {"id": 6, "description": "Get quotes from contractors", "status": "pending"},
-                {"id": 7, "description": "Select and hire contractor", "status": "pending"},
-                {"id": 8, "description": "Order materials and fixtures", "status": "pending"},
-                {
-                    "id": 9,
-                    "description": "Prepare space and protect furniture",
-                    "status": "pending",
-                },
-                {"id": 10, "description": "Execute demolition phase", "status": "pending"},
-                {"id": 11, "description": "Complete structural work", "status": "pending"},
-                {"id": 12, "description": "Install electrical and plumbing", "status": "pending"},
-                {
-                    "id": 13,
-                    "description": "Complete finishing work and painting",
-                    "status": "pending",
-                },
-                {"id": 14, "description": "Final inspection and cleanup", "status": "pending"},
-                {"id": 15, "description": "Furnish and decorate", "status": "pending"},
-            ],
-            milestones=[4, 7, 11, 14],
-            dependencies={
-                5: [4],
-                6: [4],
-                7: [6],
-                8: [7],
-                9: [8],
-                10: [9],
-                11: [10],
-                12: [11],
-                13: [12],
-            },
-        )
+    __slots__ = (
+        "_by_category",
+        "_by_tag",
+        "_search_cache",
+        "_sorted_by_name",
+        "_sorted_categories",
+        "_templates",
+        "_templates_tuple",
+        "_token_index",
+    )
 
-    def _create_study_plan_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="study_plan",
-            name="Exam Study Plan",
-            description="Structured preparation plan for exams or certifications",
-            category="education",
-            estimated_duration="4-12 weeks",
-            tags=["education", "study", "exam"],
-            steps=[
-                {
-                    "id": 1,
-                    "description": "Review exam syllabus and requirements",
-                    "status": "pending",
-                },
-                {"id": 2, "description": "Assess current knowledge level", "status": "pending"},
-                {
-                    "id": 3,
-                    "description": "Gather study materials and resources",
-                    "status": "pending",
-                },
-                {"id": 4, "description": "Create detailed study schedule", "status": "pending"},
-                {"id": 5, "description": "Study topic area 1", "status": "pending"},
-                {"id": 6, "description": "Study topic area 2", "status": "pending"},
-                {"id": 7, "description": "Study topic area 3", "status": "pending"},
-                {"id": 8, "description": "Complete practice questions set 1", "status": "pending"},
-                {"id": 9, "description": "Review weak areas identified", "status": "pending"},
-                {"id": 10, "description": "Complete full practice exam 1", "status": "pending"},
-                {"id": 11, "description": "Study topic area 4", "status": "pending"},
-                {"id": 12, "description": "Complete practice questions set 2", "status": "pending"},
-                {"id": 13, "description": "Complete full practice exam 2", "status": "pending"},
-                {"id": 14, "description": "Final review of all topics", "status": "pending"},
-                {
-                    "id": 15,
-                    "description": "Exam day preparation and execution",
-                    "status": "pending",
-                },
-            ],
-            milestones=[4, 10, 13, 15],
-            dependencies={8: [5, 6, 7], 9: [8], 10: [8, 9], 12: [11], 13: [12]},
-        )
+    SEARCH_CACHE_SIZE = 128
 
-    def _create_business_plan_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="business_plan",
-            name="Business Plan Development",
-            description="Create a comprehensive business plan for a new venture",
-            category="business",
-            estimated_duration="4-8 weeks",
-            tags=["business", "startup", "entrepreneurship"],
-            steps=[
-                {"id": 1, "description": "Define business concept and vision", "status": "pending"},
-                {
-                    "id": 2,
-                    "description": "Conduct market research and analysis",
-                    "status": "pending",
-                },
-                {
-                    "id": 3,
-                    "description": "Analyze competitors and positioning",
-                    "status": "pending",
-                },
-                {"id": 4, "description": "Define target customer personas", "status": "pending"},
-                {"id": 5, "description": "Develop value proposition", "status": "pending"},
-                {"id": 6, "description": "Create revenue model and pricing", "status": "pending"},
-                {"id": 7, "description": "Build financial projections", "status": "pending"},
-                {"id": 8, "description": "Plan marketing and sales strategy", "status": "pending"},
-                {"id": 9, "description": "Define operational plan", "status": "pending"},
-                {
-                    "id": 10,
-                    "description": "Identify key team and resources needed",
-                    "status": "pending",
-                },
-                {
-                    "id": 11,
-                    "description": "Assess risks and mitigation strategies",
-                    "status": "pending",
-                },
-                {"id": 12, "description": "Write executive summary", "status": "pending"},
-                {"id": 13, "description": "Compile and review full plan", "status": "pending"},
-                {"id": 14, "description": "Prepare pitch deck", "status": "pending"},
-                {
-                    "id": 15,
-                    "description": "Present to stakeholders or investors",
-                    "status": "pending",
-                },
-            ],
-            milestones=[4, 7, 13, 15],
-        )
+    def __init__(self):
+        self._templates: dict[str, PlanTemplate] = {}
+        self._by_category: dict[str, list[PlanTemplate]] = {}
+        self._by_tag: dict[str, list[PlanTemplate]] = {}
+        self._token_index: dict[str, set[str]] = {}
+        self._templates_tuple: tuple[PlanTemplate, ...] = ()
+        self._sorted_by_name: tuple[PlanTemplate, ...] = ()
+        self._sorted_categories: tuple[str, ...] = ()
+        self._search_cache: dict[str, list[PlanTemplate]] = {}
+        self._register_default_templates()
 
-    def _create_fitness_goal_template(self) -> PlanTemplate:
-        return PlanTemplate(
-            id="fitness_goal",
-            name="Fitness Goal Achievement",
-            description="Structured plan to reach a specific fitness goal",
-            category="health",
-            estimated_duration="8-16 weeks",
-            tags=["fitness", "health", "workout"],
-            steps=[
-                {"id": 1, "description": "Define specific fitness goal", "status": "pending"},
-                {"id": 2, "description": "Assess current fitness level", "status": "pending"},
-                {
-                    "id": 3,
-                    "description": "Consult with fitness professional if needed",
-                    "status": "pending",
-                },
-                {"id": 4, "description": "Create workout schedule", "status": "pending"},
-                {"id": 5, "description": "Plan nutrition and meal prep", "status": "pending"},
-                {"id": 6, "description": "Weeks 1-2: Foundation phase", "status": "pending"},
-                {"id": 7, "description": "Weeks 3-4: Building consistency", "status": "pending"},
-                {"id": 8, "description": "Weeks 5-6: Progressive overload", "status": "pending"},
-                {"id": 9, "description": "Weeks 7-8: Mid-point assessment", "status": "pending"},
-                {"id": 10, "description": "Weeks 9-10: Intensification", "status": "pending"},
-                {"id": 11, "description": "Weeks 11-12: Peak training", "status": "pending"},
-                {"id": 12, "description": "Weeks 13-14: Refinement", "status": "pending"},
-                {
-                    "id": 13,
-                    "description": "Weeks 15-16: Final preparation and goal attempt",
-                    "status": "pending",
-                },
-                {
-                    "id": 14,
-                    "description": "Evaluate results and set next goal",
-                    "status": "pending",
-                },
-            ],
-            milestones=[4, 9, 13, 14],
-        )
+    def _register_default_templates(self) -> None:
+        """Register built-in templates."""
+        # Built once per process and shared; each registry gets its own dict of them
+        self._templates = dict(_DEFAULT_TEMPLATES)
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        """Rebuild indexes and drop cached query results after the templates change."""
+        self._templates_tuple = tuple(self._templates.values())
+        self._sorted_by_name = tuple(sorted(self._templates_tuple, key=attrgetter("name")))
+
+        by_category = defaultdict(list)
+        by_tag = defaultdict(list)
+        token_index = defaultdict(set)
+        for template in self._sorted_by_name:
+            by_category[template.category].append(template)
+            for tag in template._tags_lower:
+                by_tag[tag].append(template)
+            for text in (template._name_lower, template._description_lower, *template._tags_lower):
+                for token in _TOKEN_SPLIT.split(text):
+                    if token:
+                        token_index[token].add(template.id)
+
+        self._by_category = dict(by_category)
+        self._by_tag = dict(by_tag)
+        self._token_index = dict(token_index)
+        self._sorted_categories = tuple(sorted(self._by_category))
+        self._search_cache.clear()
 
     def get_template(self, template_id: str) -> PlanTemplate | None:
         """Get a template by ID."""
@@ -619,56 +204,413 @@ class TemplateRegistry:
 
     def list_templates(self, category: str | None = None) -> list[PlanTemplate]:
         """List all templates, optionally filtered by category."""
-        templates = list(self._templates.values())
-
         if category:
-            templates = [t for t in templates if t.category == category]
+            return list(self._by_category.get(category, ()))
 
-        return sorted(templates, key=lambda t: t.name)
+        return list(self._sorted_by_name)
 
     def get_categories(self) -> list[str]:
         """Get all unique template categories."""
-        return sorted(set(t.category for t in self._templates.values()))
+        return list(self._sorted_categories)
 
     def search_templates(self, query: str) -> list[PlanTemplate]:
         """Search templates by name or description."""
         query_lower = query.lower()
-        matches = []
-
-        for template in self._templates.values():
-            if (
-                query_lower in template.name.lower()
-                or query_lower in template.description.lower()
-                or any(query_lower in tag.lower() for tag in template.tags)
-            ):
-                matches.append(template)
-
-        return matches
+        cached = self._search_cache.get(query_lower)
+        if cached is not None:
+            return list(cached)
+
+        # Exact tag hits come straight from the index; only the rest need scanning
+        matches = list(self._by_tag.get(query_lower, []))
+        tagged = {template.id for template in matches}
+
+        if _WORD.fullmatch(query_lower):
+            # A single-word query can only occur inside one token, so scanning the
+            # token vocabulary finds exactly the templates a full-text scan would
+            hits = set()
+            for token, template_ids in self._token_index.items():
+                if query_lower in token:
+                    hits |= template_ids
+            matches.extend(
+                template
+                for template in self._templates_tuple
+                if template.id in hits and template.id not in tagged
+            )
+        else:
+            matches.extend(
+                template
+                for template in self._templates_tuple
+                if template.id not in tagged
+                and (
+                    query_lower in template._name_lower
+                    or query_lower in template._description_lower
+                    or any(query_lower in tag for tag in template._tags_lower)
+                )
+            )
+
+        if len(self._search_cache) >= self.SEARCH_CACHE_SIZE:
+            del self._search_cache[next(iter(self._search_cache))]
+        self._search_cache[query_lower] = matches
+
+        return list(matches)
+
+
+# Built-in templates as PlanTemplate constructor arguments, in field order:
+# id, name, description, category, steps, estimated_duration, tags, dependencies, milestones
+_DEFAULT_TEMPLATE_DATA: tuple[tuple[Any, ...], ...] = (
+    (
+        "trip",
+        "Trip Planning",
+        "Plan a complete trip with destinations, bookings, and activities",
+        "travel",
+        (
+            (1, "Choose destination and travel dates"),
+            (2, "Research visa and entry requirements"),
+            (3, "Book flights or transportation"),
+            (4, "Book accommodation"),
+            (5, "Create itinerary with key attractions"),
+            (6, "Arrange travel insurance"),
+            (7, "Prepare packing list and documents"),
+            (8, "Set up local currency and payments"),
+            (9, "Book restaurant reservations if needed"),
+            (10, "Final check-in and departure preparation"),
+        ),
+        "2-8 weeks",
+        ("travel", "vacation", "planning"),
+        None,
+        (3, 4, 7),
+    ),
+    (
+        "event",
+        "Event Planning",
+        "Organize an event from concept to execution",
+        "events",
+        (
+            (1, "Define event purpose and goals"),
+            (2, "Set budget and allocate resources"),
+            (3, "Choose date and venue"),
+            (4, "Create guest list and send invitations"),
+            (5, "Arrange catering and menu"),
+            (6, "Plan entertainment and activities"),
+            (7, "Coordinate decorations and theme"),
+            (8, "Arrange transportation if needed"),
+            (9, "Prepare event schedule and timeline"),
+            (10, "Execute event and handle day-of logistics"),
+            (11, "Follow-up and gather feedback"),
+        ),
+        "4-12 weeks",
+        ("event", "party", "organization"),
+        None,
+        (3, 4, 10),
+    ),
+    (
+        "website",
+        "Website Development",
+        "Build a complete website from design to deployment",
+        "development",
+        (
+            (1, "Define website goals and target audience"),
+            (2, "Create sitemap and content structure"),
+            (3, "Design wireframes and mockups"),
+            (4, "Choose technology stack and hosting"),
+            (5, "Develop frontend UI components"),
+            (6, "Develop backend and database"),
+            (7, "Create and populate content"),
+            (8, "Implement SEO and analytics"),
+            (9, "Test functionality and responsiveness"),
+            (10, "Deploy to production"),
+            (11, "Post-launch monitoring and fixes"),
+        ),
+        "4-8 weeks",
+        ("web", "development", "coding"),
+        {5: [4], 6: [4], 9: [5, 6, 7]},
+        (3, 6, 10),
+    ),
+    (
+        "mobile_app",
+        "Mobile App Development",
+        "Build a mobile application for iOS and Android",
+        "development",
+        (
+            (1, "Define app concept and unique value proposition"),
+            (2, "Research competitors and market fit"),
+            (3, "Create user personas and user stories"),
+            (4, "Design app architecture and tech stack"),
+            (5, "Create wireframes and UI/UX designs"),
+            (6, "Set up development environment and CI/CD"),
+            (7, "Develop core features (MVP)"),
+            (8, "Implement authentication and security"),
+            (9, "Build backend API and database"),
+            (10, "Integrate third-party services"),
+            (11, "Conduct internal testing and QA"),
+            (12, "Beta testing with users"),
+            (13, "Prepare app store listings"),
+            (14, "Submit to App Store and Play Store"),
+            (15, "Launch and monitor metrics"),
+        ),
+        "8-16 weeks",
+        ("mobile", "app", "development"),
+        {7: [4, 5], 8: [7], 9: [4], 10: [7, 9], 11: [7, 8, 10]},
+        (5, 7, 12, 14),
+    ),
+    (
+        "product_launch",
+        "Product Launch",
+        "Launch a new product with marketing and sales strategy",
+        "business",
+        (
+            (1, "Finalize product specifications and pricing"),
+            (2, "Define target market and positioning"),
+            (3, "Create marketing strategy and messaging"),
+            (4, "Develop sales materials and presentations"),
+            (5, "Set up distribution channels"),
+            (6, "Create launch website and landing pages"),
+            (7, "Plan launch event or announcement"),
+            (8, "Prepare press releases and media kit"),
+            (9, "Coordinate with influencers and partners"),
+            (10, "Set up customer support processes"),
+            (11, "Execute launch campaign"),
+            (12, "Monitor results and gather feedback"),
+        ),
+        "6-12 weeks",
+        ("product", "launch", "marketing"),
+        None,
+        (3, 6, 11),
+    ),
+    (
+        "wedding",
+        "Wedding Planning",
+        "Plan a wedding ceremony and reception",
+        "events",
+        (
+            (1, "Set overall budget and priorities"),
+            (2, "Create preliminary guest list"),
+            (3, "Choose wedding date and season"),
+            (4, "Book ceremony and reception venues"),
+            (5, "Hire wedding planner or coordinator"),
+            (6, "Book photographer and videographer"),
+            (7, "Book caterer and finalize menu"),
+            (8, "Order wedding dress and attire"),
+            (9, "Book florist and choose decorations"),
+            (10, "Arrange transportation"),
+            (11, "Book officiant or ceremony leader"),
+            (12, "Send save-the-dates"),
+            (13, "Book entertainment (DJ/band)"),
+            (14, "Plan honeymoon"),
+            (15, "Send formal invitations"),
+            (16, "Finalize ceremony details and vows"),
+            (17, "Rehearsal dinner and final walkthrough"),
+            (18, "Wedding day execution"),
+        ),
+        "6-18 months",
+        ("wedding", "marriage", "celebration"),
+        None,
+        (4, 8, 12, 15, 18),
+    ),
+    (
+        "job_hunt",
+        "Job Search",
+        "Organized approach to finding a new job",
+        "career",
+        (
+            (1, "Update resume and LinkedIn profile"),
+            (2, "Define target roles and companies"),
+            (3, "Research salary ranges and market rates"),
+            (4, "Create cover letter templates"),
+            (5, "Set up job alerts on major platforms"),
+            (6, "Apply to 5-10 positions per week"),
+            (7, "Network and request informational interviews"),
+            (8, "Prepare for common interview questions"),
+            (9, "Practice technical assessments"),
+            (10, "Follow up on applications"),
+            (11, "Attend interviews and debrief"),
+            (12, "Evaluate offers and negotiate terms"),
+            (13, "Accept offer and prepare for transition"),
+        ),
+        "4-16 weeks",
+        ("career", "job", "employment"),
+        None,
+        (2, 6, 12),
+    ),
+    (
+        "content_creation",
+        "Content Creation Series",
+        "Plan and execute a content series (blog, video, podcast)",
+        "creative",
+        (
+            (1, "Define content niche and audience"),
+            (2, "Research trending topics and keywords"),
+            (3, "Create content calendar with topics"),
+            (4, "Set up necessary equipment and tools"),
+            (5, "Produce first batch of content"),
+            (6, "Edit and polish content"),
+            (7, "Create thumbnails and promotional assets"),
+            (8, "Schedule and publish content"),
+            (9, "Promote on social media channels"),
+            (10, "Engage with audience and respond to comments"),
+            (11, "Analyze performance metrics"),
+            (12, "Iterate based on feedback and data"),
+        ),
+        "4-8 weeks",
+        ("content", "creative", "media"),
+        None,
+        (3, 6, 8),
+    ),
+    (
+        "home_renovation",
+        "Home Renovation Project",
+        "Plan a home renovation from design to completion",
+        "home",
+        (
+            (1, "Define renovation scope and goals"),
+            (2, "Set budget including contingency"),
+            (3, "Research and hire architect/designer"),
+            (4, "Create design plans and 3D renderings"),
+            (5, "Obtain necessary permits"),
+            (6, "Get quotes from contractors"),
+            (7, "Select and hire contractor"),
+            (8, "Order materials and fixtures"),
+            (9, "Prepare space and protect furniture"),
+            (10, "Execute demolition phase"),
+            (11, "Complete structural work"),
+            (12, "Install electrical and plumbing"),
+            (13, "Complete finishing work and painting"),
+            (14, "Final inspection and cleanup"),
+            (15, "Furnish and decorate"),
+        ),
+        "8-24 weeks",
+        ("home", "renovation", "construction"),
+        {5: [4], 6: [4], 7: [6], 8: [7], 9: [8], 10: [9], 11: [10], 12: [11], 13: [12]},
+        (4, 7, 11, 14),
+    ),
+    (
+        "study_plan",
+        "Exam Study Plan",
+        "Structured preparation plan for exams or certifications",
+        "education",
+        (
+            (1, "Review exam syllabus and requirements"),
+            (2, "Assess current knowledge level"),
+            (3, "Gather study materials and resources"),
+            (4, "Create detailed study schedule"),
+            (5, "Study topic area 1"),
+            (6, "Study topic area 2"),
+            (7, "Study topic area 3"),
+            (8, "Complete practice questions set 1"),
+            (9, "Review weak areas identified"),
+            (10, "Complete full practice exam 1"),
+            (11, "Study topic area 4"),
+            (12, "Complete practice questions set 2"),
+            (13, "Complete full practice exam 2"),
+            (14, "Final review of all topics"),
+            (15, "Exam day preparation and execution"),
+        ),
+        "4-12 weeks",
+        ("education", "study", "exam"),
+        {8: [5, 6, 7], 9: [8], 10: [8, 9], 12: [11], 13: [12]},
+        (4, 10, 13, 15),
+    ),
+    (
+        "business_plan",
+        "Business Plan Development",
+        "Create a comprehensive business plan for a new venture",
+        "business",
+        (
+            (1, "Define business concept and vision"),
+            (2, "Conduct market research and analysis"),
+            (3, "Analyze competitors and positioning"),
+            (4, "Define target customer personas"),
+            (5, "Develop value proposition"),
+            (6, "Create revenue model and pricing"),
+            (7, "Build financial projections"),
+            (8, "Plan marketing and sales strategy"),
+            (9, "Define operational plan"),
+            (10, "Identify key team and resources needed"),
+            (11, "Assess risks and mitigation strategies"),
+            (12, "Write executive summary"),
+            (13, "Compile and review full plan"),
+            (14, "Prepare pitch deck"),
+            (15, "Present to stakeholders or investors"),
+        ),
+        "4-8 weeks",
+        ("business", "startup", "entrepreneurship"),
+        None,
+        (4, 7, 13, 15),
+    ),
+    (
+        "fitness_goal",
+        "Fitness Goal Achievement",
+        "Structured plan to reach a specific fitness goal",
+        "health",
+        (
+            (1, "Define specific fitness goal"),
+            (2, "Assess current fitness level"),
+            (3, "Consult with fitness professional if needed"),
+            (4, "Create workout schedule"),
+            (5, "Plan nutrition and meal prep"),
+            (6, "Weeks 1-2: Foundation phase"),
+            (7, "Weeks 3-4: Building consistency"),
+            (8, "Weeks 5-6: Progressive overload"),
+            (9, "Weeks 7-8: Mid-point assessment"),
+            (10, "Weeks 9-10: Intensification"),
+            (11, "Weeks 11-12: Peak training"),
+            (12, "Weeks 13-14: Refinement"),
+            (13, "Weeks 15-16: Final preparation and goal attempt"),
+            (14, "Evaluate results and set next goal"),
+        ),
+        "8-16 weeks",
+        ("fitness", "health", "workout"),
+        None,
+        (4, 9, 13, 14),
+    ),
+)
+
+_DEFAULT_TEMPLATES = {row[0]: PlanTemplate(*row) for row in _DEFAULT_TEMPLATE_DATA}
+
+_default_registry: TemplateRegistry | None = None
+
+
+def _get_default_registry() -> TemplateRegistry:
+    """Get the registry shared by applicators created without one."""
+    global _default_registry
+
+    if _default_registry is None:
+        _default_registry = TemplateRegistry()
+    return _default_registry
 
 
 class TemplateApplicator:
     """Applies templates to create new plans."""
 
+    __slots__ = ("_registry",)
+
     def __init__(self, registry: TemplateRegistry | None = None):
-        self._registry = registry or TemplateRegistry()
+        self._registry = registry or _get_default_registry()
 
     def apply_template(
         self,
         template_id: str,
         custom_title: str | None = None,
+        precise: bool = False,
     ) -> dict[str, Any] | None:
-        """Apply a template to create a new plan dictionary."""
+        """Apply a template to create a new plan dictionary.
+
+        Plans created within the same second share a timestamp unless
+        precise is set.
+        """
         template = self._registry.get_template(template_id)
         if not template:
             return None
 
-        from datetime import datetime
-
-        timestamp = datetime.now().isoformat()
+        timestamp = _current_timestamp(precise)
+        title = custom_title or template.name
+        skeleton = template._skeleton
+        # dict.copy skips the generic mapping path that dict(step) goes through
+        steps = [step.copy() for step in skeleton["steps"]]
 
         return {
-            "title": custom_title or template.name,
-            "steps": [dict(step) for step in template.steps],
+            "title": title,
+            "steps": steps,
             "version": 1,
             "created_at": timestamp,
             "updated_at": timestamp,
@@ -677,37 +619,33 @@ class TemplateApplicator:
                     "version": 1,
                     "timestamp": timestamp,
                     "action": "created",
-                    "title": custom_title or template.name,
-                    "steps": [dict(step) for step in template.steps],
+                    "title": title,
+                    "steps": [step.copy() for step in steps],
                 }
             ],
-            "summary": f"Plan for {custom_title or template.name} with {len(template.steps)} steps.",
+            "summary": f"Plan for {title} with {len(steps)} steps.",
             "metadata": {
-                "total_steps": len(template.steps),
-                "completed_steps": 0,
-                "status": "draft",
-                "template_id": template_id,
-                "estimated_duration": template.estimated_duration,
-                "dependencies": template.dependencies,
-                "milestones": template.milestones,
+                **skeleton["metadata"],
+                # Templates are shared, so the plan gets its own copies
+                "dependencies": template.dependency_map(),
+                "milestones": list(template.milestones),
             },
             "tags": [],
         }
 
-    def get_template_preview(self, template_id: str) -> dict[str, Any] | None:
-        """Get a preview of a template without creating a plan."""
+    def preview(self, template_id: str) -> Mapping[str, Any] | None:
+        """Get a read-only view of the plan a template would create, without copying.
+
+        Use apply_template when a mutable plan is needed.
+        """
         template = self._registry.get_template(template_id)
         if not template:
             return None
+        return template._preview_plan
 
-        return {
-            "id": template.id,
-            "name": template.name,
-            "description": template.description,
-            "category": template.category,
-            "estimated_duration": template.estimated_duration,
-            "step_count": len(template.steps),
-            "tags": template.tags,
-            "has_dependencies": bool(template.dependencies),
-            "has_milestones": bool(template.milestones),
-        }
+    def get_template_preview(self, template_id: str) -> Mapping[str, Any] | None:
+        """Get a read-only preview of a template without creating a plan."""
+        template = self._registry.get_template(template_id)
+        if not template:
+            return None
+        return template._summary
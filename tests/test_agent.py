@@ -1,23 +1,85 @@
+import gzip
+import json
+import pickle
+from copy import deepcopy
+
+import orjson
 import pytest
 from langchain_core.messages import AIMessage, HumanMessage
 
-from graph import ActionType, AgentState, analyze_user_intent, count_tokens
+from graph import ActionType, analyze_user_intent, count_tokens, new_state
+from sessions import BackgroundSaver, SessionManager, SessionStorage
 from tools import (
+    UndoRedoManager,
+    analyze_plan,
     appknox_security_audit,
     ask_clarifying_question,
+    assess_plan_risks,
     create_plan,
     detect_ambiguity,
+    estimate_plan_duration,
     export_plan,
     generate_executive_summary,
     generate_plan_diff,
     generate_plan_summary,
     get_plan_statistics,
+    mark_milestone,
+    suggest_plan_improvements,
     update_plan,
 )
 
+# Call the functions behind the @tool wrappers directly so tests skip argument validation;
+# test_export_plan_integration still exercises the tool interface
+_create_plan = create_plan.func
+_update_plan = update_plan.func
+_generate_plan_summary = generate_plan_summary.func
+_generate_plan_diff = generate_plan_diff.func
+_export_plan = export_plan.func
+_get_plan_statistics = get_plan_statistics.func
+_detect_ambiguity = detect_ambiguity.func
+_ask_clarifying_question = ask_clarifying_question.func
+_appknox_security_audit = appknox_security_audit.func
+_generate_executive_summary = generate_executive_summary.func
+_analyze_plan = analyze_plan.func
+_assess_plan_risks = assess_plan_risks.func
+_estimate_plan_duration = estimate_plan_duration.func
+_suggest_plan_improvements = suggest_plan_improvements.func
+_mark_milestone = mark_milestone.func
+
+# The code under test never mutates messages, so tests share these instances
+_TOKEN_MESSAGES = (
+    HumanMessage(content="Hello world, this is a test message."),
+    AIMessage(content="This is the response."),
+)
+_LARGE_MESSAGE = HumanMessage(content="Word " * 1000)
+_TRIP_REQUEST = HumanMessage(content="I want to plan a trip to Paris")
+_ADD_FLIGHTS_REQUEST = HumanMessage(content="Add a step for booking flights")
+_HELLO = HumanMessage(content="Hello")
+_NEW_MESSAGE = HumanMessage(content="New message")
+_APP_CONVERSATION = (
+    HumanMessage(content="I want to build a mobile app"),
+    AIMessage(content="What type of app?"),
+    HumanMessage(content="An e-commerce app for selling clothes"),
+)
+_ADD_PUSH_REQUEST = HumanMessage(content="Add a step for push notifications")
+
+
+@pytest.fixture(scope="session")
+def base_plan_factory():
+    """Hand out fresh copies of "Test Plan" with steps "Step 1".."Step n", built once."""
+    base_plans = {
+        n: _create_plan(title="Test Plan", steps=[f"Step {i}" for i in range(1, n + 1)])
+        for n in (1, 2, 3)
+    }
+
+    def make(n: int = 1) -> dict:
+        return deepcopy(base_plans[n])
+
+    return make
+
 
 def test_create_plan_basic():
-    result = create_plan.invoke({"title": "Test Plan", "steps": ["Step 1", "Step 2"]})
+    result = _create_plan(title="Test Plan", steps=["Step 1", "Step 2"])
     plan = result
     assert plan["title"] == "Test Plan"
     assert plan["version"] == 1
@@ -30,7 +92,7 @@ def test_create_plan_basic():
 
 
 def test_create_plan_with_summary():
-    result = create_plan.invoke({"title": "Trip to Paris", "steps": ["Book flight", "Book hotel"]})
+    result = _create_plan(title="Trip to Paris", steps=["Book flight", "Book hotel"])
     plan = result
     assert "summary" in plan
     assert "Trip to Paris" in plan["summary"]
@@ -38,21 +100,18 @@ def test_create_plan_with_summary():
 
 
 def test_create_plan_empty_steps():
-    result = create_plan.invoke({"title": "Empty Plan", "steps": []})
+    result = _create_plan(title="Empty Plan", steps=[])
     plan = result
     assert plan["metadata"]["total_steps"] == 0
 
 
-def test_update_plan_add_step():
-    initial_result = create_plan.invoke({"title": "Test Plan", "steps": ["Step 1"]})
-    initial_plan = initial_result
+def test_update_plan_add_step(base_plan_factory):
+    initial_plan = base_plan_factory(1)
     assert initial_plan["version"] == 1
     assert len(initial_plan["steps"]) == 1
 
     modifications = [{"action": "add", "description": "Step 2"}]
-    updated_result = update_plan.invoke(
-        {"current_plan": initial_plan, "modifications": modifications}
-    )
+    updated_result = _update_plan(current_plan=initial_plan, modifications=modifications)
     updated = updated_result
 
     assert updated["version"] == 2
@@ -62,12 +121,10 @@ def test_update_plan_add_step():
 
 
 def test_update_plan_modify_step():
-    initial_result = create_plan.invoke({"title": "Test Plan", "steps": ["Original step"]})
+    initial_result = _create_plan(title="Test Plan", steps=["Original step"])
     initial_plan = initial_result
     modifications = [{"action": "update", "id": 1, "description": "Modified step"}]
-    updated_result = update_plan.invoke(
-        {"current_plan": initial_plan, "modifications": modifications}
-    )
+    updated_result = _update_plan(current_plan=initial_plan, modifications=modifications)
     updated = updated_result
 
     assert updated["version"] == 2
@@ -75,16 +132,11 @@ def test_update_plan_modify_step():
     assert "Modified step" in updated["summary"]
 
 
-def test_update_plan_remove_step():
-    initial_result = create_plan.invoke(
-        {"title": "Test Plan", "steps": ["Step 1", "Step 2", "Step 3"]}
-    )
-    initial_plan = initial_result
+def test_update_plan_remove_step(base_plan_factory):
+    initial_plan = base_plan_factory(3)
 
     modifications = [{"action": "remove", "id": 2}]
-    updated_result = update_plan.invoke(
-        {"current_plan": initial_plan, "modifications": modifications}
-    )
+    updated_result = _update_plan(current_plan=initial_plan, modifications=modifications)
     updated = updated_result
 
     assert updated["version"] == 2
@@ -93,29 +145,44 @@ def test_update_plan_remove_step():
     assert updated["steps"][1]["id"] == 2
 
 
-def test_update_plan_status():
-    result = create_plan.invoke({"title": "Test Plan", "steps": ["Step 1"]})
-    plan = result
+def test_update_plan_remove_then_add_reports_final_ids(base_plan_factory):
+    initial_plan = base_plan_factory(3)
+
+    modifications = [
+        {"action": "remove", "id": 1},
+        {"action": "add", "description": "Step 4"},
+        {"action": "update", "id": 4, "status": "completed"},
+    ]
+    updated = _update_plan(current_plan=initial_plan, modifications=modifications)
+
+    assert [s["id"] for s in updated["steps"]] == [1, 2, 3]
+    assert updated["steps"][2]["description"] == "Step 4"
+    assert updated["history"][-1]["changes"] == [
+        "Removed step 1: Step 1",
+        "Added step 3: Step 4",
+        "Modified step 3",
+    ]
+
+
+def test_update_plan_status(base_plan_factory):
+    plan = base_plan_factory(1)
     modifications = [{"action": "update", "id": 1, "status": "completed"}]
-    updated_result = update_plan.invoke({"current_plan": plan, "modifications": modifications})
+    updated_result = _update_plan(current_plan=plan, modifications=modifications)
     updated = updated_result
 
     assert updated["steps"][0]["status"] == "completed"
     assert updated["version"] == 2
 
 
-def test_update_plan_multiple_modifications():
-    initial_result = create_plan.invoke({"title": "Test Plan", "steps": ["Step 1"]})
-    initial_plan = initial_result
+def test_update_plan_multiple_modifications(base_plan_factory):
+    initial_plan = base_plan_factory(1)
 
     modifications = [
         {"action": "update", "id": 1, "description": "Updated Step 1"},
         {"action": "add", "description": "Step 2"},
         {"action": "add", "description": "Step 3"},
     ]
-    updated_result = update_plan.invoke(
-        {"current_plan": initial_plan, "modifications": modifications}
-    )
+    updated_result = _update_plan(current_plan=initial_plan, modifications=modifications)
     updated = updated_result
 
     assert updated["version"] == 2
@@ -124,13 +191,14 @@ def test_update_plan_multiple_modifications():
 
 
 def test_plan_history_tracking():
-    result = create_plan.invoke({"title": "History Test", "steps": ["Step 1"]})
+    result = _create_plan(title="History Test", steps=["Step 1"])
     plan = result
     assert len(plan["history"]) == 1
     assert plan["history"][0]["version"] == 1
 
-    updated_result = update_plan.invoke(
-        {"current_plan": plan, "modifications": [{"action": "add", "description": "Step 2"}]}
+    updated_result = _update_plan(
+        current_plan=plan,
+        modifications=[{"action": "add", "description": "Step 2"}],
     )
     updated = updated_result
     assert len(updated["history"]) == 2
@@ -139,20 +207,16 @@ def test_plan_history_tracking():
 
 
 def test_plan_history_preserves_old_versions():
-    initial = create_plan.invoke({"title": "Test", "steps": ["Original"]})
+    initial = _create_plan(title="Test", steps=["Original"])
 
-    v2 = update_plan.invoke(
-        {
-            "current_plan": initial,
-            "modifications": [{"action": "update", "id": 1, "description": "Version 2"}],
-        }
+    v2 = _update_plan(
+        current_plan=initial,
+        modifications=[{"action": "update", "id": 1, "description": "Version 2"}],
     )
 
-    v3 = update_plan.invoke(
-        {
-            "current_plan": v2,
-            "modifications": [{"action": "update", "id": 1, "description": "Version 3"}],
-        }
+    v3 = _update_plan(
+        current_plan=v2,
+        modifications=[{"action": "update", "id": 1, "description": "Version 3"}],
     )
 
     assert len(v3["history"]) == 3
@@ -160,28 +224,27 @@ def test_plan_history_preserves_old_versions():
     assert v3["history"][1]["steps"][0]["description"] == "Version 2"
 
 
-def test_generate_plan_summary():
-    result = create_plan.invoke({"title": "Test Plan", "steps": ["Step 1", "Step 2", "Step 3"]})
-    plan = result
-    summary = generate_plan_summary.invoke({"plan": plan})
+def test_generate_plan_summary(base_plan_factory):
+    plan = base_plan_factory(3)
+    summary = _generate_plan_summary(plan=plan)
 
     assert "Test Plan" in summary
     assert "3" in summary or "three" in summary.lower()
 
 
 def test_generate_plan_summary_empty():
-    summary = generate_plan_summary.invoke({"plan": {}})
+    summary = _generate_plan_summary(plan={})
     assert "No plan" in summary or "no plan" in summary.lower()
 
 
-def test_generate_plan_diff():
-    result = create_plan.invoke({"title": "Test Plan", "steps": ["Step 1"]})
-    plan = result
-    updated_result = update_plan.invoke(
-        {"current_plan": plan, "modifications": [{"action": "add", "description": "Step 2"}]}
+def test_generate_plan_diff(base_plan_factory):
+    plan = base_plan_factory(1)
+    updated_result = _update_plan(
+        current_plan=plan,
+        modifications=[{"action": "add", "description": "Step 2"}],
     )
     updated = updated_result
-    diff = generate_plan_diff.invoke({"plan": updated})
+    diff = _generate_plan_diff(plan=updated)
 
     assert "Step 2" in diff
     assert "ADDED" in diff or "added" in diff.lower()
@@ -189,43 +252,40 @@ def test_generate_plan_diff():
 
 def test_generate_plan_diff_no_history():
     plan = {"title": "Test", "steps": []}
-    diff = generate_plan_diff.invoke({"plan": plan})
+    diff = _generate_plan_diff(plan=plan)
     assert "No previous" in diff or "no" in diff.lower()
 
 
 def test_generate_plan_diff_modification():
-    result = create_plan.invoke({"title": "Test Plan", "steps": ["Original"]})
+    result = _create_plan(title="Test Plan", steps=["Original"])
     plan = result
-    updated_result = update_plan.invoke(
-        {
-            "current_plan": plan,
-            "modifications": [{"action": "update", "id": 1, "description": "Modified"}],
-        }
+    updated_result = _update_plan(
+        current_plan=plan,
+        modifications=[{"action": "update", "id": 1, "description": "Modified"}],
     )
     updated = updated_result
-    diff = generate_plan_diff.invoke({"plan": updated})
+    diff = _generate_plan_diff(plan=updated)
 
     assert "Modified" in diff or "modified" in diff.lower()
     assert "Original" in diff
 
 
-def test_generate_executive_summary():
-    result = create_plan.invoke({"title": "Test Plan", "steps": ["Step 1", "Step 2"]})
-    plan = result
+def test_generate_executive_summary(base_plan_factory):
+    plan = base_plan_factory(2)
     summary_text = "Discussed requirements for the test plan."
-    exec_summary = generate_executive_summary.invoke({"summary": summary_text, "plan": plan})
+    exec_summary = _generate_executive_summary(summary=summary_text, plan=plan)
 
     assert "Test Plan" in exec_summary or "EXECUTIVE" in exec_summary
 
 
 def test_generate_executive_summary_empty():
-    exec_summary = generate_executive_summary.invoke({"summary": "", "plan": {}})
+    exec_summary = _generate_executive_summary(summary="", plan={})
     assert "No plan" in exec_summary or "No conversation" in exec_summary
 
 
 def test_appknox_security_audit():
     plan = {"steps": [{"id": 1, "description": "Code step"}]}
-    result = appknox_security_audit.invoke({"plan": plan})
+    result = _appknox_security_audit(plan=plan)
 
     assert "SAST" in result
     assert "DAST" in result
@@ -233,11 +293,7 @@ def test_appknox_security_audit():
 
 
 def test_token_counting():
-    messages = [
-        HumanMessage(content="Hello world, this is a test message."),
-        AIMessage(content="This is the response."),
-    ]
-    token_count = count_tokens(messages)
+    token_count = count_tokens(list(_TOKEN_MESSAGES))
     assert token_count > 0
     assert token_count > 10
 
@@ -249,76 +305,66 @@ def test_token_counting_empty():
 
 
 def test_token_counting_large_messages():
-    large_content = "Word " * 1000
-    messages = [HumanMessage(content=large_content)]
-    token_count = count_tokens(messages)
+    token_count = count_tokens([_LARGE_MESSAGE])
     assert token_count > 500
 
 
 def test_detect_ambiguity_vague_request():
-    result = detect_ambiguity.invoke({"user_input": "I want to build something"})
+    result = _detect_ambiguity(user_input="I want to build something")
     assert result["is_ambiguous"] is True
     assert len(result["questions"]) > 0
 
 
 def test_detect_ambiguity_clear_request():
-    result = detect_ambiguity.invoke(
-        {
-            "user_input": "I want to build an e-commerce website selling books with a 3 month timeline"
-        }
+    result = _detect_ambiguity(
+        user_input="I want to build an e-commerce website selling books with a 3 month timeline",
     )
     assert isinstance(result["is_ambiguous"], bool)
 
 
 def test_detect_ambiguity_website():
-    result = detect_ambiguity.invoke({"user_input": "I want to build a website"})
+    result = _detect_ambiguity(user_input="I want to build a website")
     assert result["is_ambiguous"] is True
     assert any("type" in q.lower() for q in result["questions"])
 
 
 def test_detect_ambiguity_trip():
-    result = detect_ambiguity.invoke({"user_input": "Plan a trip"})
+    result = _detect_ambiguity(user_input="Plan a trip")
     assert result["is_ambiguous"] is True
     assert any("where" in q.lower() or "destination" in q.lower() for q in result["questions"])
 
 
 def test_detect_ambiguity_event():
-    result = detect_ambiguity.invoke({"user_input": "I want to plan an event"})
+    result = _detect_ambiguity(user_input="I want to plan an event")
     assert result["is_ambiguous"] is True
 
 
 def test_ask_clarifying_question():
-    result = ask_clarifying_question.invoke(
-        {
-            "context": "User wants to build a website",
-            "missing_info": ["What type of website?", "What's the timeline?"],
-        }
+    result = _ask_clarifying_question(
+        context="User wants to build a website",
+        missing_info=["What type of website?", "What's the timeline?"],
     )
     assert result["has_questions"] is True
     assert len(result["questions"]) == 2
 
 
 def test_ask_clarifying_question_no_duplicates():
-    result = ask_clarifying_question.invoke(
-        {
-            "context": "User wants to build a website",
-            "missing_info": ["What type?", "What's the timeline?"],
-            "previous_questions": ["What type?"],
-        }
+    result = _ask_clarifying_question(
+        context="User wants to build a website",
+        missing_info=["What type?", "What's the timeline?"],
+        previous_questions=["What type?"],
     )
     assert "What type?" not in result.get("questions", [])
 
 
 def test_get_plan_statistics():
-    plan = create_plan.invoke({"title": "Stats Test", "steps": ["Step 1", "Step 2", "Step 3"]})
-    plan = update_plan.invoke(
-        {
-            "current_plan": plan,
-            "modifications": [{"action": "update", "id": 1, "status": "completed"}],
-        }
+    plan = _create_plan(title="Stats Test", steps=["Step 1", "Step 2", "Step 3"])
+    plan = _update_plan(
+        current_plan=plan,
+        modifications=[{"action": "update", "id": 1, "status": "completed"}],
     )
 
-    stats = get_plan_statistics.invoke({"plan": plan})
+    stats = _get_plan_statistics(plan=plan)
 
     assert stats["total_steps"] == 3
     assert stats["completed_steps"] == 1
@@ -327,8 +373,8 @@ def test_get_plan_statistics():
 
 
 def test_export_plan_markdown():
-    plan = create_plan.invoke({"title": "Export Test", "steps": ["Step 1", "Step 2"]})
-    export = export_plan.invoke({"plan": plan, "format": "markdown"})
+    plan = _create_plan(title="Export Test", steps=["Step 1", "Step 2"])
+    export = _export_plan(plan=plan, format="markdown")
 
     assert "# Export Test" in export
     assert "Step 1" in export
@@ -336,68 +382,49 @@ def test_export_plan_markdown():
 
 
 def test_export_plan_json():
-    plan = create_plan.invoke({"title": "JSON Test", "steps": ["Step 1"]})
-    export = export_plan.invoke({"plan": plan, "format": "json"})
-
-    import json
-
-    data = json.loads(export)
+    plan = _create_plan(title="JSON Test", steps=["Step 1"])
+    export = _export_plan(plan=plan, format="json")
+    data = orjson.loads(export)
     assert data["title"] == "JSON Test"
     assert len(data["steps"]) == 1
 
 
 def test_analyze_intent_create_plan():
-    state: AgentState = {
-        "messages": [HumanMessage(content="I want to plan a trip to Paris")],
-        "summary": "",
-        "current_plan": {},
-        "conversation_turn": 1,
-        "user_preferences": {},
-        "last_action": "",
-    }
+    state = new_state(messages=[_TRIP_REQUEST], conversation_turn=1)
     result = analyze_user_intent(state)
     assert result in [ActionType.CREATE_PLAN, ActionType.GENERAL_CHAT]
 
 
 def test_analyze_intent_modify_plan():
-    state: AgentState = {
-        "messages": [HumanMessage(content="Add a step for booking flights")],
-        "summary": "",
-        "current_plan": {"title": "Trip", "steps": [{"id": 1, "description": "Step 1"}]},
-        "conversation_turn": 3,
-        "user_preferences": {},
-        "last_action": "",
-    }
+    state = new_state(
+        messages=[_ADD_FLIGHTS_REQUEST],
+        current_plan={"title": "Trip", "steps": [{"id": 1, "description": "Step 1"}]},
+        conversation_turn=3,
+    )
     result = analyze_user_intent(state)
     assert result in [ActionType.UPDATE_PLAN, ActionType.GENERAL_CHAT]
 
 
 def test_full_plan_workflow():
-    plan = create_plan.invoke(
-        {
-            "title": "Website Project",
-            "steps": ["Design mockups", "Develop frontend", "Develop backend"],
-        }
+    plan = _create_plan(
+        title="Website Project",
+        steps=["Design mockups", "Develop frontend", "Develop backend"],
     )
 
-    plan = update_plan.invoke(
-        {
-            "current_plan": plan,
-            "modifications": [
-                {"action": "add", "description": "Testing"},
-                {"action": "add", "description": "Deployment"},
-            ],
-        }
+    plan = _update_plan(
+        current_plan=plan,
+        modifications=[
+            {"action": "add", "description": "Testing"},
+            {"action": "add", "description": "Deployment"},
+        ],
     )
 
-    plan = update_plan.invoke(
-        {
-            "current_plan": plan,
-            "modifications": [
-                {"action": "update", "id": 1, "status": "completed"},
-                {"action": "update", "id": 2, "status": "completed"},
-            ],
-        }
+    plan = _update_plan(
+        current_plan=plan,
+        modifications=[
+            {"action": "update", "id": 1, "status": "completed"},
+            {"action": "update", "id": 2, "status": "completed"},
+        ],
     )
 
     assert plan["version"] == 3
@@ -408,32 +435,24 @@ def test_full_plan_workflow():
 
 
 def test_multi_turn_conversation_simulation():
-    conversation_history = []
-
-    conversation_history.append(HumanMessage(content="I want to build a mobile app"))
-    conversation_history.append(AIMessage(content="What type of app?"))
-    conversation_history.append(HumanMessage(content="An e-commerce app for selling clothes"))
-
-    plan = create_plan.invoke(
-        {
-            "title": "E-commerce Clothing App",
-            "steps": [
-                "Design UI/UX",
-                "Set up database",
-                "Implement auth",
-                "Build product catalog",
-                "Add shopping cart",
-                "Integrate payments",
-            ],
-        }
+    conversation_history = list(_APP_CONVERSATION)
+
+    plan = _create_plan(
+        title="E-commerce Clothing App",
+        steps=[
+            "Design UI/UX",
+            "Set up database",
+            "Implement auth",
+            "Build product catalog",
+            "Add shopping cart",
+            "Integrate payments",
+        ],
     )
 
-    conversation_history.append(HumanMessage(content="Add a step for push notifications"))
-    plan = update_plan.invoke(
-        {
-            "current_plan": plan,
-            "modifications": [{"action": "add", "description": "Implement push notifications"}],
-        }
+    conversation_history.append(_ADD_PUSH_REQUEST)
+    plan = _update_plan(
+        current_plan=plan,
+        modifications=[{"action": "add", "description": "Implement push notifications"}],
     )
 
     assert len(conversation_history) >= 4
@@ -446,14 +465,7 @@ def test_context_management_no_compression():
     """Test that context_management_node returns correct state when no compression needed."""
     from graph import context_management_node
 
-    state = {
-        "messages": [HumanMessage(content="Hello")],
-        "summary": "",
-        "current_plan": {},
-        "conversation_turn": 0,
-        "user_preferences": {},
-        "last_action": "",
-    }
+    state = new_state(messages=[_HELLO])
 
     result = context_management_node(state)
 
@@ -467,14 +479,7 @@ def test_context_management_turn_increment():
     """Test that conversation_turn is properly incremented."""
     from graph import context_management_node
 
-    state = {
-        "messages": [],
-        "summary": "Existing summary",
-        "current_plan": {},
-        "conversation_turn": 5,
-        "user_preferences": {},
-        "last_action": "",
-    }
+    state = new_state(summary="Existing summary", conversation_turn=5)
 
     result = context_management_node(state)
 
@@ -503,14 +508,12 @@ def test_context_management_preserves_summary():
     from graph import context_management_node
 
     existing_summary = "Previous conversation about trip planning"
-    state = {
-        "messages": [HumanMessage(content="New message")],
-        "summary": existing_summary,
-        "current_plan": {"title": "Trip"},
-        "conversation_turn": 3,
-        "user_preferences": {},
-        "last_action": "",
-    }
+    state = new_state(
+        messages=[_NEW_MESSAGE],
+        summary=existing_summary,
+        current_plan={"title": "Trip"},
+        conversation_turn=3,
+    )
 
     result = context_management_node(state)
 
@@ -518,5 +521,177 @@ def test_context_management_preserves_summary():
     assert result["summary"] == existing_summary
 
 
+def test_analyze_plan_matches_individual_tools():
+    plan = _create_plan(
+        title="Website project",
+        steps=["Design urgent landing page", "Build API integration", "Research hosting"],
+    )
+
+    result = _analyze_plan(current_plan=plan)
+
+    assert result["risks"] == _assess_plan_risks(current_plan=plan)
+    assert result["duration"] == _estimate_plan_duration(current_plan=plan)
+    assert result["suggestions"] == _suggest_plan_improvements(current_plan=plan)
+
+
+def test_analyze_plan_cached_results_are_not_shared():
+    plan = _create_plan(title="Cache Test", steps=["Urgent deadline review", "Step 2"])
+
+    first = _analyze_plan(current_plan=plan)
+    first["risks"][0]["risk_factors"].append("mutated")
+    first["risks"].clear()
+
+    second = _analyze_plan(current_plan=plan)
+    assert len(second["risks"]) == 2
+    assert "mutated" not in second["risks"][0]["risk_factors"]
+    assert second["risks"] == _assess_plan_risks(current_plan=plan)
+
+
+def test_mark_milestone_normalizes_unsorted_milestones(base_plan_factory):
+    plan = base_plan_factory(3)
+    plan["metadata"]["milestones"] = [3, 1, 3]
+
+    result = _mark_milestone(current_plan=plan, step_id=2)
+
+    assert result["metadata"]["milestones"] == [1, 2, 3]
+    assert result["steps"][1]["is_milestone"] is True
+    assert plan["metadata"]["milestones"] == [3, 1, 3]
+
+
+def _plan_versions(count: int) -> list[dict]:
+    """Return successive versions of a plan, each adding one step to the previous."""
+    plans = [_create_plan(title="Undo Test", steps=["Step 1"])]
+    for i in range(2, count + 1):
+        plans.append(
+            _update_plan(
+                current_plan=plans[-1],
+                modifications=[{"action": "add", "description": f"Step {i}"}],
+            )
+        )
+    return plans
+
+
+def test_undo_redo_round_trip_across_checkpoints():
+    manager = UndoRedoManager()
+    plans = _plan_versions(15)
+
+    state = {"current_plan": plans[0]}
+    for plan in plans[1:]:
+        state = manager.push_state(state, plan)
+
+    assert manager.peek_undo(state) == plans[-2]
+    assert len(state["undo_stack"]) == len(plans) - 1
+
+    for expected in reversed(plans[:-1]):
+        previous, state = manager.undo(state)
+        assert previous == expected
+        state["current_plan"] = previous
+    assert manager.undo(state)[0] is None
+
+    for expected in plans[1:]:
+        following, state = manager.redo(state)
+        assert following == expected
+        state["current_plan"] = following
+    assert manager.redo(state)[0] is None
+
+
+def test_undo_stack_evicts_oldest_entries():
+    manager = UndoRedoManager()
+    plans = _plan_versions(UndoRedoManager.MAX_STACK_SIZE + 12)
+
+    state = {"current_plan": plans[0]}
+    for plan in plans[1:]:
+        state = manager.push_state(state, plan)
+
+    assert len(state["undo_stack"]) == UndoRedoManager.MAX_STACK_SIZE
+    assert manager.peek_undo(state) == plans[-2]
+
+    # The oldest kept entry must still rebuild after its base checkpoint was evicted
+    trimmed = UndoRedoManager.trim_stack(state["undo_stack"], 3)
+    assert manager.peek_undo({"undo_stack": trimmed}) == plans[-2]
+    restored = [manager._plan_at(trimmed, i) for i in range(len(trimmed))]
+    assert restored == plans[-4:-1]
+
+    for expected in reversed(plans[-UndoRedoManager.MAX_STACK_SIZE - 1 : -1]):
+        previous, state = manager.undo(state)
+        assert previous == expected
+        state["current_plan"] = previous
+    assert manager.undo(state)[0] is None
+
+
+def test_peek_undo_leaves_stacks_unchanged():
+    manager = UndoRedoManager()
+    plans = _plan_versions(3)
+
+    assert manager.peek_undo({"current_plan": plans[0]}) is None
+
+    state = manager.push_state({"current_plan": plans[0]}, plans[1])
+    state = manager.push_state(state, plans[2])
+    stack_before = list(state["undo_stack"])
+
+    assert manager.peek_undo(state) == plans[1]
+    assert list(state["undo_stack"]) == stack_before
+    assert manager.undo(state)[0] == plans[1]
+
+
+def test_session_save_list_search_load(tmp_path):
+    manager = SessionManager(storage=SessionStorage(tmp_path))
+    plan = _create_plan(title="Paris Trip", steps=["Book hotel", "Buy tickets"])
+    state = new_state(messages=[_TRIP_REQUEST], current_plan=plan)
+
+    manager.save("session-1", state, title="Paris Trip", tags=["Travel"])
+
+    # A fresh manager reads the listing from the on-disk index
+    reopened = SessionManager(storage=SessionStorage(tmp_path))
+    sessions = reopened.list_sessions()
+    assert [s["session_id"] for s in sessions] == ["session-1"]
+    assert sessions[0]["title"] == "Paris Trip"
+    assert sessions[0]["has_plan"] is True
+
+    assert [r["match_reason"] for r in reopened.search("paris")] == ["title"]
+    assert [r["match_reason"] for r in reopened.search("travel")] == ["tag"]
+    assert [r["match_reason"] for r in reopened.search("HOTEL")] == ["plan content"]
+    assert reopened.search("nowhere") == []
+
+    loaded = reopened.load("session-1")
+    assert loaded["current_plan"] == plan
+    assert [m.content for m in loaded["messages"]] == [_TRIP_REQUEST.content]
+
+    assert reopened.delete("session-1")
+    assert SessionManager(storage=SessionStorage(tmp_path)).list_sessions() == []
+
+
+def test_legacy_session_files_are_migrated(tmp_path):
+    gzip_session = {"session_id": "old-gzip", "title": "Gzip", "current_plan": {"title": "G"}}
+    json_session = {"session_id": "old-json", "title": "Json", "current_plan": {"title": "J"}}
+    (tmp_path / "old-gzip.json.gz").write_bytes(gzip.compress(pickle.dumps(gzip_session)))
+    (tmp_path / "old-json.json").write_text(json.dumps(json_session))
+
+    manager = SessionManager(storage=SessionStorage(tmp_path))
+
+    assert not (tmp_path / "old-gzip.json.gz").exists()
+    assert not (tmp_path / "old-json.json").exists()
+    assert manager.load("old-gzip")["current_plan"] == {"title": "G"}
+    assert manager.load("old-json")["current_plan"] == {"title": "J"}
+    assert {s["title"] for s in manager.list_sessions()} == {"Gzip", "Json"}
+
+
+def test_background_saver_writes_state_as_submitted(tmp_path):
+    manager = SessionManager(storage=SessionStorage(tmp_path))
+    saver = BackgroundSaver(manager)
+    plan = _create_plan(title="Background", steps=["Step 1"])
+    state = new_state(messages=[_HELLO], current_plan=plan, session_id="bg-session")
+
+    saver.submit(state)
+    # Later changes to the live state must not reach the queued save
+    state["messages"].append(_NEW_MESSAGE)
+    state["current_plan"]["title"] = "Changed"
+    saver.flush()
+
+    loaded = manager.load("bg-session")
+    assert [m.content for m in loaded["messages"]] == [_HELLO.content]
+    assert loaded["current_plan"]["title"] == "Background"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
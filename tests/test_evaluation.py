@@ -4,33 +4,28 @@ These tests evaluate the agent's responses using semantic metrics.
 Requires OPENAI_API_KEY to be set for DeepEval.
 """
 
+import asyncio
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 
 import pytest
 from langchain_core.messages import AIMessage, HumanMessage
 
-pytestmark = pytest.mark.skipif(
-    not os.environ.get("OPENAI_API_KEY"), reason="OPENAI_API_KEY not set - DeepEval tests skipped"
-)
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(
+        not os.environ.get("OPENAI_API_KEY"),
+        reason="OPENAI_API_KEY not set - DeepEval tests skipped",
+    ),
+]
 
 
-def test_plan_creation_flow():
-    from graph import app
+_FLOW_PROMPTS = ("Plan a trip", "Plan a product launch")
 
-    mock_response = AIMessage(
-        content="I've created a plan for your trip. Let me show you the details.",
-        tool_calls=[
-            {
-                "name": "create_plan",
-                "args": {"title": "Test Plan", "steps": ["Step 1"]},
-                "id": "call_1",
-            }
-        ],
-    )
 
-    inputs = {
-        "messages": [HumanMessage(content="Plan a trip")],
+def _flow_inputs(prompt: str) -> dict:
+    return {
+        "messages": [HumanMessage(content=prompt)],
         "summary": "",
         "current_plan": {},
         "conversation_turn": 0,
@@ -38,63 +33,99 @@ def test_plan_creation_flow():
         "last_action": "",
     }
 
-    with patch("llm_providers.get_openai_llm") as mock_get_llm:
-        mock_instance = MagicMock()
-        mock_instance.bind_tools.return_value.invoke.return_value = mock_response
-        mock_get_llm.return_value = mock_instance
-
-        valid_output = False
-
-        async def run_test():
-            nonlocal valid_output
-            async for output in app.astream(inputs):
-                if "agent" in output:
-                    valid_output = True
 
-        import asyncio
+async def _reaches_agent(app, inputs: dict) -> bool:
+    reached = False
+    async for output in app.astream(inputs):
+        if "agent" in output:
+            reached = True
+    return reached
 
-        asyncio.run(run_test())
-        assert valid_output
-
-
-def test_security_audit_trigger():
-    from deepeval import assert_test
-    from deepeval.metrics import AnswerRelevancyMetric
-    from deepeval.test_case import LLMTestCase
 
-    metric = AnswerRelevancyMetric(threshold=0.5)
-    test_case = LLMTestCase(
-        input="Check security",
-        actual_output="Running AppKnox Audit...",
-        expected_output="Running AppKnox Audit...",
+@pytest.fixture(scope="session")
+def mock_openai_llm():
+    """A mock LLM whose bound tools always answer with a create_plan tool call."""
+    llm = MagicMock()
+    llm.bind_tools.return_value.invoke.return_value = AIMessage(
+        content="I've created a plan for your trip. Let me show you the details.",
+        tool_calls=[
+            {
+                "name": "create_plan",
+                "args": {"title": "Test Plan", "steps": ["Step 1"]},
+                "id": "call_1",
+            }
+        ],
     )
-    assert_test(test_case, [metric])
+    return llm
 
 
-def test_clarification_request():
-    from deepeval import assert_test
-    from deepeval.metrics import AnswerRelevancyMetric
-    from deepeval.test_case import LLMTestCase
+@pytest.mark.asyncio
+async def test_plan_creation_flow(mock_openai_llm, monkeypatch):
+    from graph import app
 
-    metric = AnswerRelevancyMetric(threshold=0.5)
-    test_case = LLMTestCase(
-        input="I want to build a website",
-        actual_output="What type of website? (e-commerce, blog, portfolio, etc.)",
-        expected_output="What type of website?",
-    )
-    assert_test(test_case, [metric])
+    monkeypatch.setattr("llm_providers.get_openai_llm", lambda *args, **kwargs: mock_openai_llm)
 
+    # Independent conversations stream concurrently on the same event loop
+    results = await asyncio.gather(
+        *(_reaches_agent(app, _flow_inputs(prompt)) for prompt in _FLOW_PROMPTS)
+    )
 
-def test_plan_modification():
-    from deepeval import assert_test
-    from deepeval.metrics import FaithfulnessMetric
+    assert all(results)
+
+
+_EVAL_CASES = {
+    "security_audit_trigger": (
+        "relevancy",
+        {
+            "input": "Check security",
+            "actual_output": "Running AppKnox Audit...",
+            "expected_output": "Running AppKnox Audit...",
+        },
+    ),
+    "clarification_request": (
+        "relevancy",
+        {
+            "input": "I want to build a website",
+            "actual_output": "What type of website? (e-commerce, blog, portfolio, etc.)",
+            "expected_output": "What type of website?",
+        },
+    ),
+    "plan_modification": (
+        "faithfulness",
+        {
+            "input": "Add a step for testing",
+            "actual_output": "I've added a testing step to your plan.",
+            "expected_output": "I've added a testing step to your plan.",
+            "retrieval_context": ["Plan modification successful"],
+        },
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def eval_results():
+    """Evaluate every case in one evaluate() call per metric and map results by input."""
+    from deepeval import evaluate
+    from deepeval.metrics import AnswerRelevancyMetric, FaithfulnessMetric
     from deepeval.test_case import LLMTestCase
 
-    metric = FaithfulnessMetric(threshold=0.5)
-    test_case = LLMTestCase(
-        input="Add a step for testing",
-        actual_output="I've added a testing step to your plan.",
-        expected_output="I've added a testing step to your plan.",
-        retrieval_context=["Plan modification successful"],
-    )
-    assert_test(test_case, [metric])
+    metrics = {
+        "relevancy": AnswerRelevancyMetric(threshold=0.5),
+        "faithfulness": FaithfulnessMetric(threshold=0.5),
+    }
+    results = {}
+    for metric_name, metric in metrics.items():
+        cases = [
+            LLMTestCase(**fields) for kind, fields in _EVAL_CASES.values() if kind == metric_name
+        ]
+        outcome = evaluate(test_cases=cases, metrics=[metric])
+        for test_result in getattr(outcome, "test_results", outcome):
+            results[test_result.input] = test_result
+    return results
+
+
+@pytest.mark.parametrize("case_id", list(_EVAL_CASES))
+def test_eval_case(case_id, eval_results):
+    _, fields = _EVAL_CASES[case_id]
+    result = eval_results[fields["input"]]
+    assert result.success, f"{case_id} failed: {result.metrics_data}"
@@ -4,40 +4,109 @@ Provides tools for plan creation, modification, analysis, and visualization.
 All tools are decorated with @tool for LangChain integration.
 """
 
-from copy import deepcopy
+import re
+import sys
+from bisect import bisect_right
+from collections import Counter, defaultdict, deque
 from datetime import datetime, timedelta
-from typing import Any
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, TypedDict
 
+import jsonpatch
+import orjson
 from langchain_core.tools import tool
 
 
+class PlanStep(TypedDict, total=False):
+    """A single plan step; only id, description and status are always present."""
+
+    id: int
+    description: str
+    status: str
+    created_at: str
+    updated_at: str
+    due_date: str
+    estimated_hours: int
+    is_milestone: bool
+    sub_steps: list["PlanStep"]
+
+
+class PlanHistoryEntry(TypedDict, total=False):
+    """A recorded plan version in Plan.history."""
+
+    version: int
+    timestamp: str
+    action: str
+    title: str
+    steps: list[PlanStep]
+    changes: list[str]
+
+
+class Plan(TypedDict, total=False):
+    """Plan dict produced by create_plan and update_plan."""
+
+    title: str
+    steps: list[PlanStep]
+    version: int
+    created_at: str
+    updated_at: str
+    history: list[PlanHistoryEntry]
+    summary: str
+    metadata: dict[str, Any]
+
+
+def _fast_clone_plan(plan: dict[str, Any]) -> dict[str, Any]:
+    """Deep-copy a JSON-shaped plan via an orjson round-trip (much faster than deepcopy)."""
+    return orjson.loads(orjson.dumps(plan, option=orjson.OPT_NON_STR_KEYS, default=str))
+
+
+def _find_step_index(steps: list[PlanStep], step_id: int) -> int | None:
+    """Return the position of the step with ``step_id``, or None if there is none.
+
+    Plan tools number steps 1..N in order, so the step normally sits at ``step_id - 1``
+    and only plans with gaps in their ids fall back to a scan.
+    """
+    if 0 < step_id <= len(steps) and steps[step_id - 1]["id"] == step_id:
+        return step_id - 1
+    return next((i for i, step in enumerate(steps) if step["id"] == step_id), None)
+
+
+# Fields every newly created step starts with
+_STEP_DEFAULTS = MappingProxyType({"status": "pending"})
+
+# Plan versions kept in plan["history"]; generate_plan_diff only reads the last two
+MAX_PLAN_HISTORY = 8
+
+
 @tool
-def create_plan(title: str, steps: list[str]) -> dict[str, Any]:
+def create_plan(title: str, steps: list[str]) -> Plan:
     """Create a new plan with a title and list of steps."""
     timestamp = datetime.now().isoformat()
-    plan = {
+    plan_steps = [
+        {"id": i, "description": step, **_STEP_DEFAULTS, "created_at": timestamp}
+        for i, step in enumerate(steps, 1)
+    ]
+    step_count = len(plan_steps)
+    return {
         "title": title,
-        "steps": [
-            {"id": i + 1, "description": step, "status": "pending", "created_at": timestamp}
-            for i, step in enumerate(steps)
-        ],
+        "steps": plan_steps,
         "version": 1,
         "created_at": timestamp,
         "updated_at": timestamp,
-        "history": [],
-        "summary": f"Plan for {title} with {len(steps)} steps.",
-        "metadata": {"total_steps": len(steps), "completed_steps": 0, "status": "draft"},
+        "history": [
+            {
+                "version": 1,
+                "timestamp": timestamp,
+                "action": "created",
+                "title": title,
+                "steps": plan_steps,
+            }
+        ],
+        "summary": f"Plan for {title} with {step_count} steps.",
+        "metadata": {"total_steps": step_count, "completed_steps": 0, "status": "draft"},
     }
-    plan["history"].append(
-        {
-            "version": 1,
-            "timestamp": timestamp,
-            "action": "created",
-            "title": title,
-            "steps": [s.copy() for s in plan["steps"]],
-        }
-    )
-    return plan
 
 
 @tool
@@ -45,11 +114,13 @@ def update_plan(
     current_plan: dict[str, Any],
     modifications: list[dict[str, Any]],
     new_title: str | None = None,
-) -> dict[str, Any]:
+) -> Plan:
     """Update an existing plan with modifications.
 
     IMPORTANT: For "update" and "remove" actions, you MUST provide the "id" field.
     The id is the step number shown in the plan (e.g., id=2 for "Step 2").
+    Ids always refer to the plan as shown; remaining steps are renumbered once
+    after all removals in a batch.
 
     Args:
         current_plan: The current plan to update
@@ -66,129 +137,156 @@ def update_plan(
         raise ValueError("No current plan provided for update")
 
     timestamp = datetime.now().isoformat()
+    # Recorded history entries are never mutated, so share them rather than clone them
+    source = _fast_clone_plan({**current_plan, "history": []})
     updated_plan = {
-        "title": new_title if new_title else current_plan.get("title", "Untitled"),
-        "steps": [s.copy() for s in current_plan.get("steps", [])],
-        "version": current_plan.get("version", 1),
-        "created_at": current_plan.get("created_at", timestamp),
-        "history": current_plan.get("history", []),
-        "metadata": current_plan.get("metadata", {}),
+        "title": new_title if new_title else source.get("title", "Untitled"),
+        "steps": source.get("steps", []),
+        "version": source.get("version", 1),
+        "created_at": source.get("created_at", timestamp),
+        "history": current_plan.get("history", [])[-(MAX_PLAN_HISTORY - 1) :],
+        "metadata": source.get("metadata", {}),
     }
 
-    changes = []
+    # Messages naming a kept step are formatted after the batch, so they use its final id
+    changes: list[str | Callable[[], str]] = []
 
     if new_title and new_title != current_plan.get("title", "Untitled"):
         changes.append(f"Updated title: '{current_plan.get('title', 'Untitled')}' -> '{new_title}'")
 
     existing_steps = updated_plan["steps"]
+    # Index steps by id and cache lowercased descriptions; rebuilt whenever ids change
+    step_index = {s["id"]: s for s in existing_steps}
+    lowered = {s["id"]: s["description"].lower() for s in existing_steps}
+
+    def find_by_description(description: str) -> int | None:
+        target_desc = description.lower()
+        for candidate_id, desc in lowered.items():
+            if target_desc in desc or desc in target_desc:
+                return candidate_id
+        return None
+
+    def reindex() -> None:
+        step_index.clear()
+        step_index.update((s["id"], s) for s in existing_steps)
+        lowered.clear()
+        lowered.update((s["id"], s["description"].lower()) for s in existing_steps)
+
+    # Removals are applied in one filter-and-renumber pass, so ids stay stable meanwhile
+    removed_ids: set[int] = set()
+
+    def apply_removals() -> None:
+        if not removed_ids:
+            return
+        existing_steps[:] = [s for s in existing_steps if s["id"] not in removed_ids]
+        removed_ids.clear()
+        for i, step in enumerate(existing_steps):
+            step["id"] = i + 1
+        reindex()
+
+    def available_steps() -> str:
+        # Number the remaining steps the way they will be numbered once removals apply
+        remaining = (s for s in existing_steps if s["id"] not in removed_ids)
+        return ", ".join(
+            f"{i}: {s['description'][:30]}" for i, s in enumerate(islice(remaining, 5), 1)
+        )
 
     for mod in modifications:
         action = mod.get("action")
 
         if action == "add":
+            # Statuses arrive as fresh strings from tool arguments; interning them lets
+            # the many `== "completed"` checks short-circuit on identity
             new_id = len(existing_steps) + 1
             new_step = {
                 "id": new_id,
                 "description": mod.get("description", ""),
-                "status": mod.get("status", "pending"),
+                "status": sys.intern(mod.get("status", "pending")),
                 "created_at": timestamp,
             }
             existing_steps.append(new_step)
-            changes.append(f"Added step {new_id}: {new_step['description']}")
+            step_index[new_id] = new_step
+            lowered[new_id] = new_step["description"].lower()
+            changes.append(
+                lambda step=new_step, desc=new_step["description"]: (
+                    f"Added step {step['id']}: {desc}"
+                )
+            )
 
         elif action == "update":
             step_id = mod.get("id")
 
             # Handle missing step_id - try to find by description match
             if step_id is None and "description" in mod:
-                target_desc = mod.get("description", "").lower()
-                for step in existing_steps:
-                    if (
-                        target_desc in step["description"].lower()
-                        or step["description"].lower() in target_desc
-                    ):
-                        step_id = step["id"]
-                        changes.append(f"Auto-detected step ID {step_id} from description")
-                        break
+                step_id = find_by_description(mod.get("description", ""))
+                if step_id is not None:
+                    changes.append(f"Auto-detected step ID {step_id} from description")
 
             if step_id is None:
-                # Return error with available steps
-                available = ", ".join(
-                    [f"{s['id']}: {s['description'][:30]}" for s in existing_steps[:5]]
+                changes.append(
+                    f"ERROR: Missing 'id' for update. Available steps: {available_steps()}"
                 )
-                changes.append(f"ERROR: Missing 'id' for update. Available steps: {available}")
                 continue
 
-            found = False
-            for step in existing_steps:
-                if step["id"] == step_id:
-                    old_desc = step["description"]
-                    if "description" in mod:
-                        step["description"] = mod["description"]
-                    if "status" in mod:
-                        step["status"] = mod["status"]
-                    step["updated_at"] = timestamp
-                    if old_desc != step["description"]:
-                        changes.append(
-                            f"Updated step {step_id}: '{old_desc}' -> '{step['description']}'"
-                        )
-                    else:
-                        changes.append(f"Modified step {step_id}")
-                    found = True
-                    break
-            if not found:
+            step = step_index.get(step_id)
+            if step is None:
                 changes.append(f"Warning: Step {step_id} not found for update")
+                continue
+
+            old_desc = step["description"]
+            if "description" in mod:
+                step["description"] = mod["description"]
+                lowered[step_id] = step["description"].lower()
+            if "status" in mod:
+                step["status"] = sys.intern(mod["status"])
+            step["updated_at"] = timestamp
+            if old_desc != step["description"]:
+                changes.append(
+                    lambda step=step, old=old_desc, new=step["description"]: (
+                        f"Updated step {step['id']}: '{old}' -> '{new}'"
+                    )
+                )
+            else:
+                changes.append(lambda step=step: f"Modified step {step['id']}")
 
         elif action == "remove":
             step_id = mod.get("id")
 
             # Handle missing step_id - try to find by description
             if step_id is None and "description" in mod:
-                target_desc = mod.get("description", "").lower()
-                for step in existing_steps:
-                    if (
-                        target_desc in step["description"].lower()
-                        or step["description"].lower() in target_desc
-                    ):
-                        step_id = step["id"]
-                        changes.append(f"Auto-detected step ID {step_id} from description")
-                        break
+                step_id = find_by_description(mod.get("description", ""))
+                if step_id is not None:
+                    changes.append(f"Auto-detected step ID {step_id} from description")
 
             if step_id is None:
-                # Return error with available steps
-                available = ", ".join(
-                    [f"{s['id']}: {s['description'][:30]}" for s in existing_steps[:5]]
+                changes.append(
+                    f"ERROR: Missing 'id' for removal. Available steps: {available_steps()}"
                 )
-                changes.append(f"ERROR: Missing 'id' for removal. Available steps: {available}")
                 continue
 
-            original_len = len(existing_steps)
-            removed_step = None
-            for step in existing_steps:
-                if step["id"] == step_id:
-                    removed_step = step
-                    break
-            existing_steps[:] = [s for s in existing_steps if s["id"] != step_id]
-            for i, step in enumerate(existing_steps):
-                step["id"] = i + 1
-            if len(existing_steps) < original_len and removed_step:
-                changes.append(f"Removed step {step_id}: {removed_step['description']}")
-            else:
+            removed_step = step_index.pop(step_id, None)
+            if removed_step is None:
                 changes.append(f"Warning: Step {step_id} not found for removal")
+                continue
+
+            del lowered[step_id]
+            removed_ids.add(step_id)
+            changes.append(f"Removed step {step_id}: {removed_step['description']}")
 
         elif action == "reorder":
+            apply_removals()
             new_order = mod.get("new_order", [])
             if new_order and len(new_order) == len(existing_steps):
-                step_map = {s["id"]: s for s in existing_steps}
-                reordered = []
-                for new_id in new_order:
-                    if new_id in step_map:
-                        reordered.append(step_map[new_id])
+                reordered = [step_index[new_id] for new_id in new_order if new_id in step_index]
                 for i, step in enumerate(reordered):
                     step["id"] = i + 1
-                updated_plan["steps"] = reordered
+                existing_steps[:] = reordered
+                reindex()
                 changes.append(f"Reordered steps to: {new_order}")
 
+    apply_removals()
+    changes = [change if isinstance(change, str) else change() for change in changes]
+
     updated_plan["version"] = current_plan.get("version", 1) + 1
     updated_plan["updated_at"] = timestamp
     updated_plan["history"].append(
@@ -196,7 +294,8 @@ def update_plan(
             "version": updated_plan["version"],
             "timestamp": timestamp,
             "action": "updated",
-            "steps": [s.copy() for s in updated_plan["steps"]],
+            # Shared with the returned plan; the next update works on a fresh clone
+            "steps": updated_plan["steps"],
             "changes": changes,
         }
     )
@@ -208,6 +307,7 @@ def update_plan(
         "status": "completed"
         if completed == len(updated_plan["steps"]) and len(updated_plan["steps"]) > 0
         else "in_progress",
+        "update_count": _update_count(current_plan) + 1,
     }
 
     change_summary = "; ".join(changes) if changes else "Minor updates"
@@ -220,6 +320,18 @@ def update_plan(
     return updated_plan
 
 
+def _update_count(plan: dict[str, Any]) -> int:
+    """Number of update_plan calls applied to a plan.
+
+    Tracked in metadata because history is capped; plans saved before the counter
+    existed fall back to counting "updated" history entries.
+    """
+    count = plan.get("metadata", {}).get("update_count")
+    if count is None:
+        count = sum(1 for h in plan.get("history", []) if h.get("action") == "updated")
+    return count
+
+
 @tool
 def appknox_security_audit(plan: dict[str, Any]) -> str:
     """Generate security audit recommendations using AppKnox."""
@@ -254,6 +366,12 @@ These steps will help ensure your project is secure before deployment.
 Would you like me to add these to your plan?"""
 
 
+# Borders of the 58-column boxes drawn by the plan renderers
+_BOX_TOP = "╔" + "═" * 58 + "╗"
+_BOX_DIVIDER = "╠" + "═" * 58 + "╣"
+_BOX_BOTTOM = "╚" + "═" * 58 + "╝"
+
+
 @tool
 def generate_plan_summary(plan: dict[str, Any]) -> str:
     """Generate a formatted summary of the current plan."""
@@ -272,26 +390,24 @@ def generate_plan_summary(plan: dict[str, Any]) -> str:
 
     lines = [
         "",
-        "╔" + "═" * 58 + "╗",
+        _BOX_TOP,
         f"║{'📋 PLAN: ' + title[:48]:^58}║",
         f"║{'Version ' + str(version) + ' (' + str(completed) + '/' + str(total) + ' completed)':^58}║",
-        "╠" + "═" * 58 + "╣",
+        _BOX_DIVIDER,
     ]
 
     if not steps:
         lines.append(f"║{'No steps defined yet':^58}║")
     else:
+        row = "║{:<58}║".format
         for step in steps:
             status_icon = "✅" if step.get("status") == "completed" else "⬜"
-            desc = (
-                step["description"][:50] + "..."
-                if len(step["description"]) > 50
-                else step["description"]
-            )
-            line = f"{status_icon} Step {step['id']}: {desc}"
-            lines.append(f"║{line:<58}║")
+            desc = step["description"]
+            if len(desc) > 50:
+                desc = desc[:50] + "..."
+            lines.append(row(f"{status_icon} Step {step['id']}: {desc}"))
 
-    lines.append("╚" + "═" * 58 + "╝")
+    lines.append(_BOX_BOTTOM)
     lines.append("")
 
     return "\n".join(lines)
@@ -312,31 +428,33 @@ def generate_plan_diff(plan: dict[str, Any]) -> str:
 
     old_steps = {s["id"]: s for s in old.get("steps", [])}
     new_steps = {s["id"]: s for s in new.get("steps", [])}
-    all_ids = set(old_steps.keys()) | set(new_steps.keys())
+    all_ids = old_steps.keys() | new_steps.keys()
 
     lines = [
         "",
-        "╔" + "═" * 58 + "╗",
+        _BOX_TOP,
         f"║{'📊 PLAN CHANGES':^58}║",
         f"║{'v' + str(old['version']) + ' → v' + str(new['version']):^58}║",
-        "╠" + "═" * 58 + "╣",
+        _BOX_DIVIDER,
     ]
 
     has_changes = False
     for step_id in sorted(all_ids):
-        if step_id not in old_steps:
+        old_step = old_steps.get(step_id)
+        new_step = new_steps.get(step_id)
+        if old_step is None:
             has_changes = True
-            desc = new_steps[step_id]["description"][:45]
+            desc = new_step["description"][:45]
             lines.append(f"║  ➕ ADDED Step {step_id}: {desc:<35}║")
-        elif step_id not in new_steps:
+        elif new_step is None:
             has_changes = True
-            desc = old_steps[step_id]["description"][:42]
+            desc = old_step["description"][:42]
             lines.append(f"║  ➖ REMOVED Step {step_id}: {desc:<32}║")
-        elif old_steps[step_id]["description"] != new_steps[step_id]["description"]:
+        elif old_step["description"] != new_step["description"]:
             has_changes = True
             lines.append(f"║  📝 MODIFIED Step {step_id}:{'':<38}║")
-            old_desc = old_steps[step_id]["description"][:48]
-            new_desc = new_steps[step_id]["description"][:48]
+            old_desc = old_step["description"][:48]
+            new_desc = new_step["description"][:48]
             lines.append(f"║     - {old_desc:<50}║")
             lines.append(f"║     + {new_desc:<50}║")
 
@@ -344,14 +462,12 @@ def generate_plan_diff(plan: dict[str, Any]) -> str:
         lines.append(f"║{'  (No structural changes)':<58}║")
 
     if new.get("changes"):
-        lines.append("╠" + "═" * 58 + "╣")
+        lines.append(_BOX_DIVIDER)
         lines.append(f"║{'Summary of changes:':<58}║")
         for change in new["changes"]:
-            for i in range(0, len(change), 54):
-                chunk = change[i : i + 54]
-                lines.append(f"║  • {chunk:<54}║")
+            lines.extend(f"║  • {change[i : i + 54].ljust(54)}║" for i in range(0, len(change), 54))
 
-    lines.append("╚" + "═" * 58 + "╝")
+    lines.append(_BOX_BOTTOM)
     lines.append("")
 
     return "\n".join(lines)
@@ -362,9 +478,9 @@ def generate_executive_summary(summary: str, plan: dict[str, Any]) -> str:
     """Generate an executive summary of the conversation and plan."""
     lines = [
         "",
-        "╔" + "═" * 58 + "╗",
+        _BOX_TOP,
         "║" + "📋 EXECUTIVE SUMMARY".center(58) + "║",
-        "╠" + "═" * 58 + "╣",
+        _BOX_DIVIDER,
     ]
 
     if plan:
@@ -390,7 +506,7 @@ def generate_executive_summary(summary: str, plan: dict[str, Any]) -> str:
         lines.append(f"║  📌 No plan created yet{'':<34}║")
 
     if summary:
-        lines.append("╠" + "═" * 58 + "╣")
+        lines.append(_BOX_DIVIDER)
         lines.append(f"║  {'💬 Conversation Summary:':<54}║")
         words = summary.split()
         current_line = ""
@@ -403,76 +519,102 @@ def generate_executive_summary(summary: str, plan: dict[str, Any]) -> str:
         if current_line:
             lines.append(f"║    {current_line:<52}║")
 
-    lines.append("╚" + "═" * 58 + "╝")
+    lines.append(_BOX_BOTTOM)
     lines.append("")
 
     return "\n".join(lines)
 
 
+def _keyword_pattern(*keywords: str) -> re.Pattern[str]:
+    """Compile keywords into one alternation that matches any of them as a substring."""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+_PLANNING_RE = _keyword_pattern("plan", "build", "create", "make", "organize", "schedule")
+_VAGUE_RE = _keyword_pattern("something", "anything", "stuff", "things", "it", "that")
+_CONSTRAINT_RE = _keyword_pattern("budget", "time", "deadline", "timeline", "when", "cost", "price")
+_SCOPE_RE = _keyword_pattern("website", "app", "project", "event", "trip", "product")
+
+# Topic -> follow-up questions, each skipped when the input already answers it.
+# Topics are checked in order and only the first match contributes questions.
+_TOPIC_QUESTIONS = (
+    (
+        _keyword_pattern("website"),
+        (
+            (
+                _keyword_pattern("e-commerce", "blog", "portfolio", "landing", "type"),
+                "What type of website? (e-commerce, blog, portfolio, landing page, etc.)",
+            ),
+            (
+                _keyword_pattern("sell", "showcase", "share", "purpose", "goal"),
+                "What's the main purpose or goal of the website?",
+            ),
+        ),
+    ),
+    (
+        _keyword_pattern("trip", "travel"),
+        (
+            (
+                _keyword_pattern("destination", "where", "place", "country", "city"),
+                "Where would you like to travel to?",
+            ),
+            (
+                _keyword_pattern("when", "date", "duration", "how long", "days"),
+                "When are you planning to go and for how long?",
+            ),
+        ),
+    ),
+    (
+        _keyword_pattern("event"),
+        (
+            (
+                _keyword_pattern("type", "wedding", "party", "conference", "meeting"),
+                "What type of event? (wedding, party, conference, etc.)",
+            ),
+            (
+                _keyword_pattern("guests", "people", "attendees", "size"),
+                "How many guests are you expecting?",
+            ),
+        ),
+    ),
+)
+
+
 @tool
 def detect_ambiguity(user_input: str) -> dict[str, Any]:
     """Detect if a user request is ambiguous and needs clarification."""
     user_input_lower = user_input.lower()
 
-    planning_keywords = ["plan", "build", "create", "make", "organize", "schedule"]
-    has_planning_intent = any(kw in user_input_lower for kw in planning_keywords)
+    has_planning_intent = _PLANNING_RE.search(user_input_lower) is not None
 
     if not has_planning_intent:
         return {"is_ambiguous": False, "questions": []}
 
     ambiguity_indicators = []
     questions = []
+    word_count = len(user_input.split())
 
-    if len(user_input.split()) < 5:
+    if word_count < 5:
         ambiguity_indicators.append("too_short")
         questions.append("Could you provide more details about what you want to accomplish?")
 
-    vague_terms = ["something", "anything", "stuff", "things", "it", "that"]
-    if any(term in user_input_lower for term in vague_terms):
+    if _VAGUE_RE.search(user_input_lower):
         ambiguity_indicators.append("vague_terms")
         questions.append("Could you be more specific about what you're referring to?")
 
-    constraint_keywords = ["budget", "time", "deadline", "timeline", "when", "cost", "price"]
-    has_constraints = any(kw in user_input_lower for kw in constraint_keywords)
-
-    scope_indicators = ["website", "app", "project", "event", "trip", "product"]
-    has_scope = any(kw in user_input_lower for kw in scope_indicators)
+    has_constraints = _CONSTRAINT_RE.search(user_input_lower) is not None
 
-    if has_planning_intent and has_scope:
-        if "website" in user_input_lower:
-            if not any(
-                kw in user_input_lower
-                for kw in ["e-commerce", "blog", "portfolio", "landing", "type"]
-            ):
-                questions.append(
-                    "What type of website? (e-commerce, blog, portfolio, landing page, etc.)"
+    if _SCOPE_RE.search(user_input_lower):
+        for topic_re, follow_ups in _TOPIC_QUESTIONS:
+            if topic_re.search(user_input_lower):
+                questions.extend(
+                    question
+                    for answered_re, question in follow_ups
+                    if not answered_re.search(user_input_lower)
                 )
-            if not any(
-                kw in user_input_lower for kw in ["sell", "showcase", "share", "purpose", "goal"]
-            ):
-                questions.append("What's the main purpose or goal of the website?")
-
-        elif "trip" in user_input_lower or "travel" in user_input_lower:
-            if not any(
-                kw in user_input_lower
-                for kw in ["destination", "where", "place", "country", "city"]
-            ):
-                questions.append("Where would you like to travel to?")
-            if not any(
-                kw in user_input_lower for kw in ["when", "date", "duration", "how long", "days"]
-            ):
-                questions.append("When are you planning to go and for how long?")
-
-        elif "event" in user_input_lower:
-            if not any(
-                kw in user_input_lower
-                for kw in ["type", "wedding", "party", "conference", "meeting"]
-            ):
-                questions.append("What type of event? (wedding, party, conference, etc.)")
-            if not any(kw in user_input_lower for kw in ["guests", "people", "attendees", "size"]):
-                questions.append("How many guests are you expecting?")
+                break
 
-    if has_planning_intent and not has_constraints and len(user_input.split()) > 3:
+    if not has_constraints and word_count > 3:
         questions.append("Do you have any timeline or budget constraints I should know about?")
 
     return {
@@ -493,11 +635,11 @@ def ask_clarifying_question(
         missing_info: List of information that needs clarification
         previous_questions: Questions already asked to avoid repetition
     """
-    previous_questions = previous_questions or []
+    asked = set(previous_questions or ())
     # context is used by the LLM for context when this tool is called
     _ = context  # Explicitly mark as used
 
-    new_questions = [q for q in missing_info if q not in previous_questions]
+    new_questions = [q for q in missing_info if q not in asked]
 
     if not new_questions:
         return {
@@ -521,25 +663,22 @@ def get_plan_statistics(plan: dict[str, Any]) -> dict[str, Any]:
     steps = plan.get("steps", [])
     history = plan.get("history", [])
 
-    stats = {
+    status_counts = Counter(s.get("status") for s in steps)
+    total_steps = len(steps)
+    completed = status_counts["completed"]
+
+    return {
         "title": plan.get("title", "Untitled"),
         "version": plan.get("version", 1),
-        "total_steps": len(steps),
-        "completed_steps": sum(1 for s in steps if s.get("status") == "completed"),
-        "pending_steps": sum(1 for s in steps if s.get("status") == "pending"),
-        "in_progress_steps": sum(1 for s in steps if s.get("status") == "in_progress"),
+        "total_steps": total_steps,
+        "completed_steps": completed,
+        "pending_steps": status_counts["pending"],
+        "in_progress_steps": status_counts["in_progress"],
         "total_versions": len(history),
-        "modification_count": len([h for h in history if h.get("action") == "updated"]),
-        "completion_percentage": 0,
+        "modification_count": _update_count(plan),
+        "completion_percentage": round(completed / total_steps * 100, 1) if total_steps else 0,
     }
 
-    if stats["total_steps"] > 0:
-        stats["completion_percentage"] = round(
-            (stats["completed_steps"] / stats["total_steps"]) * 100, 1
-        )
-
-    return stats
-
 
 @tool
 def export_plan(plan: dict[str, Any], format: str = "markdown") -> str:
@@ -548,9 +687,9 @@ def export_plan(plan: dict[str, Any], format: str = "markdown") -> str:
         return "No plan to export"
 
     if format == "json":
-        import json
-
-        return json.dumps(plan, indent=2, default=str)
+        return orjson.dumps(
+            plan, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str
+        ).decode()
 
     elif format == "markdown":
         lines = [
@@ -612,13 +751,9 @@ class PlanValidator:
                 if dep not in step_ids:
                     issues.append(f"Step {step_id} depends on non-existent step {dep}")
 
-        descriptions = [s["description"].lower() for s in steps]
-        for i, desc in enumerate(descriptions):
-            for j, other_desc in enumerate(descriptions[i + 1 :], i + 1):
-                if self._similarity(desc, other_desc) > 0.8:
-                    recommendations.append(
-                        f"Steps {i + 1} and {j + 1} appear similar - consider merging"
-                    )
+        token_sets = [set(s["description"].lower().split()) for s in steps]
+        for i, j in self._similar_pairs(token_sets, 0.8):
+            recommendations.append(f"Steps {i + 1} and {j + 1} appear similar - consider merging")
 
         milestone_ids = set(metadata.get("milestones", []))
         for ms_id in milestone_ids:
@@ -637,15 +772,29 @@ class PlanValidator:
             "recommendations": recommendations,
         }
 
-    def _similarity(self, a: str, b: str) -> float:
-        """Calculate simple string similarity."""
-        a_words = set(a.split())
-        b_words = set(b.split())
-        if not a_words or not b_words:
-            return 0.0
-        intersection = a_words & b_words
-        union = a_words | b_words
-        return len(intersection) / len(union)
+    @staticmethod
+    def _similar_pairs(token_sets: list[set[str]], threshold: float) -> Iterator[tuple[int, int]]:
+        """Yield index pairs (i < j) whose word-set Jaccard similarity exceeds threshold.
+
+        An inverted index from word to step positions means each step is only compared
+        with steps that share a word, instead of with every other step.
+        """
+        postings: defaultdict[str, list[int]] = defaultdict(list)
+        for position, tokens in enumerate(token_sets):
+            for token in tokens:
+                postings[token].append(position)
+
+        for i, tokens in enumerate(token_sets):
+            shared: Counter[int] = Counter()
+            for token in tokens:
+                positions = postings[token]
+                shared.update(islice(positions, bisect_right(positions, i), None))
+
+            size = len(tokens)
+            for j in sorted(shared):
+                overlap = shared[j]
+                if overlap / (size + len(token_sets[j]) - overlap) > threshold:
+                    yield i, j
 
 
 class DependencyManager:
@@ -653,13 +802,15 @@ class DependencyManager:
 
     def add_dependency(self, plan: dict[str, Any], step_id: int, depends_on: int) -> dict[str, Any]:
         """Add a dependency between steps."""
-        plan = deepcopy(plan)
-        metadata = plan.setdefault("metadata", {})
-        dependencies = metadata.setdefault("dependencies", {})
+        # Copy only the path down to the changed list; steps and history stay shared
+        plan = plan.copy()
+        metadata = plan["metadata"] = dict(plan.get("metadata", {}))
+        dependencies = metadata["dependencies"] = dict(metadata.get("dependencies", {}))
 
-        step_deps = dependencies.setdefault(str(step_id), [])
+        key = str(step_id)
+        step_deps = dependencies.get(key, [])
         if depends_on not in step_deps:
-            step_deps.append(depends_on)
+            dependencies[key] = [*step_deps, depends_on]
 
         return plan
 
@@ -667,13 +818,16 @@ class DependencyManager:
         self, plan: dict[str, Any], step_id: int, depends_on: int
     ) -> dict[str, Any]:
         """Remove a dependency between steps."""
-        plan = deepcopy(plan)
+        plan = plan.copy()
         metadata = plan.get("metadata", {})
         dependencies = metadata.get("dependencies", {})
 
-        step_deps = dependencies.get(str(step_id), [])
+        key = str(step_id)
+        step_deps = dependencies.get(key, [])
         if depends_on in step_deps:
+            step_deps = list(step_deps)
             step_deps.remove(depends_on)
+            plan["metadata"] = {**metadata, "dependencies": {**dependencies, key: step_deps}}
 
         return plan
 
@@ -684,14 +838,13 @@ class DependencyManager:
         steps = plan.get("steps", [])
 
         completed_ids = {s["id"] for s in steps if s.get("status") == "completed"}
+
         blocked = []
 
         for step_id, deps in dependencies.items():
             step_id_int = int(step_id)
-            if step_id_int not in completed_ids:
-                incomplete_deps = [d for d in deps if d not in completed_ids]
-                if incomplete_deps:
-                    blocked.append(step_id_int)
+            if step_id_int not in completed_ids and not completed_ids.issuperset(deps):
+                blocked.append(step_id_int)
 
         return blocked
 
@@ -702,15 +855,23 @@ class DependencyManager:
         steps = plan.get("steps", [])
 
         completed_ids = {s["id"] for s in steps if s.get("status") == "completed"}
-        ready = []
+        deps_by_id = {int(step_id): deps for step_id, deps in dependencies.items()}
 
-        for step in steps:
-            if step.get("status") != "completed":
-                deps = dependencies.get(str(step["id"]), [])
-                if all(d in completed_ids for d in deps):
-                    ready.append(step["id"])
+        return [
+            step["id"]
+            for step in steps
+            if step.get("status") != "completed"
+            and completed_ids.issuperset(deps_by_id.get(step["id"], ()))
+        ]
 
-        return ready
+
+@lru_cache(maxsize=1024)
+def _parse_due_date(value: str) -> datetime | None:
+    """Parse a stored ISO due date, or None if it is malformed."""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
 
 
 class DueDateManager:
@@ -718,12 +879,18 @@ class DueDateManager:
 
     def set_due_date(self, plan: dict[str, Any], step_id: int, due_date: str) -> dict[str, Any]:
         """Set a due date for a specific step."""
-        plan = deepcopy(plan)
+        # Reject malformed dates here so readers never have to handle them
+        if _parse_due_date(due_date) is None:
+            raise ValueError(f"Invalid due date '{due_date}' - expected ISO format YYYY-MM-DD")
+
+        plan = plan.copy()
         steps = plan.get("steps", [])
 
-        for step in steps:
+        for i, step in enumerate(steps):
             if step["id"] == step_id:
-                step["due_date"] = due_date
+                # Replace only the touched step; the others stay shared with the input
+                steps = plan["steps"] = list(steps)
+                steps[i] = {**step, "due_date": due_date}
                 break
 
         return plan
@@ -736,12 +903,9 @@ class DueDateManager:
 
         for step in steps:
             if step.get("status") != "completed" and "due_date" in step:
-                try:
-                    due = datetime.fromisoformat(step["due_date"])
-                    if due < now:
-                        overdue.append(step)
-                except ValueError:
-                    continue
+                due = _parse_due_date(step["due_date"])
+                if due is not None and due < now:
+                    overdue.append(step)
 
         return overdue
 
@@ -752,15 +916,15 @@ class DueDateManager:
         work_days: int = 5,
     ) -> dict[str, Any]:
         """Auto-assign due dates based on dependencies and estimates."""
-        plan = deepcopy(plan)
+        # Every step gets a due date, so copy the steps but share metadata and history
+        plan = plan.copy()
         metadata = plan.get("metadata", {})
         dependencies = metadata.get("dependencies", {})
-        steps = plan.get("steps", [])
+        steps = plan["steps"] = [step.copy() for step in plan.get("steps", [])]
 
-        if not start_date:
-            start_date = datetime.now().isoformat()
-
-        current_date = datetime.fromisoformat(start_date)
+        current_date = datetime.fromisoformat(start_date) if start_date else datetime.now()
+        one_day = timedelta(days=1)
+        hours_per_day = 8 * work_days / 7
         step_dates = {}
 
         for step in steps:
@@ -771,14 +935,15 @@ class DueDateManager:
                 latest_dep_date = max(
                     (step_dates.get(d, current_date) for d in deps), default=current_date
                 )
-                current_date = latest_dep_date + timedelta(days=1)
+                current_date = latest_dep_date + one_day
 
             estimate = step.get("estimated_hours", 8)
-            days_needed = max(1, estimate // (8 * work_days / 7))
+            days_needed = max(1, estimate // hours_per_day)
 
-            step["due_date"] = (current_date + timedelta(days=days_needed)).isoformat()
-            step_dates[step_id] = current_date + timedelta(days=days_needed)
-            current_date = step_dates[step_id] + timedelta(days=1)
+            due = current_date + timedelta(days=days_needed)
+            step["due_date"] = due.isoformat()
+            step_dates[step_id] = due
+            current_date = due + one_day
 
         return plan
 
@@ -793,16 +958,21 @@ class BatchOperations:
         status: str,
     ) -> dict[str, Any]:
         """Update status for multiple steps at once."""
-        plan = deepcopy(plan)
-        steps = plan.get("steps", [])
         timestamp = datetime.now().isoformat()
+        targets = frozenset(step_ids)
+        status = sys.intern(status)
 
-        for step in steps:
-            if step["id"] in step_ids:
-                step["status"] = status
-                step["updated_at"] = timestamp
+        # Count completed steps while rebuilding the list so metadata needs no second pass
+        steps = []
+        completed = 0
+        for step in plan.get("steps", []):
+            if step["id"] in targets:
+                step = {**step, "status": status, "updated_at": timestamp}
+            if step.get("status") == "completed":
+                completed += 1
+            steps.append(step)
 
-        return self._update_metadata(plan)
+        return self._update_metadata({**plan, "steps": steps}, completed)
 
     def batch_add_steps(
         self,
@@ -810,8 +980,7 @@ class BatchOperations:
         descriptions: list[str],
     ) -> dict[str, Any]:
         """Add multiple steps at once."""
-        plan = deepcopy(plan)
-        steps = plan.get("steps", [])
+        steps = list(plan.get("steps", []))
         timestamp = datetime.now().isoformat()
 
         start_id = max((s["id"] for s in steps), default=0) + 1
@@ -826,39 +995,61 @@ class BatchOperations:
                 }
             )
 
-        return self._update_metadata(plan)
+        return self._update_metadata({**plan, "steps": steps})
 
     def batch_remove_steps(self, plan: dict[str, Any], step_ids: list[int]) -> dict[str, Any]:
-        """Remove multiple steps at once."""
-        plan = deepcopy(plan)
+        """Remove multiple steps at once.
+
+        The plan is returned unchanged when none of step_ids exist in it.
+        """
+        removed = frozenset(step_ids)
         steps = plan.get("steps", [])
+        survivors = [s for s in steps if s["id"] not in removed]
+        if len(survivors) == len(steps):
+            return plan
 
-        steps[:] = [s for s in steps if s["id"] not in step_ids]
+        # Only steps whose id changes are copied; everything else is shared
+        survivors = [
+            step if step["id"] == i else {**step, "id": i} for i, step in enumerate(survivors, 1)
+        ]
 
-        for i, step in enumerate(steps):
-            step["id"] = i + 1
+        return self._update_metadata({**plan, "steps": survivors})
 
-        return self._update_metadata(plan)
+    def _update_metadata(
+        self,
+        plan: dict[str, Any],
+        completed: int | None = None,
+    ) -> dict[str, Any]:
+        """Return a copy of the plan with metadata refreshed after batch operations.
 
-    def _update_metadata(self, plan: dict[str, Any]) -> dict[str, Any]:
-        """Update plan metadata after batch operations."""
+        Callers that already know the completed-step count can pass it to skip the recount.
+        """
         steps = plan.get("steps", [])
-        completed = sum(1 for s in steps if s.get("status") == "completed")
+        if completed is None:
+            completed = sum(1 for s in steps if s.get("status") == "completed")
 
-        plan["metadata"] = {
-            **plan.get("metadata", {}),
-            "total_steps": len(steps),
-            "completed_steps": completed,
-            "status": "completed" if completed == len(steps) and steps else "in_progress",
+        return {
+            **plan,
+            "metadata": {
+                **plan.get("metadata", {}),
+                "total_steps": len(steps),
+                "completed_steps": completed,
+                "status": "completed" if completed == len(steps) and steps else "in_progress",
+            },
         }
 
-        return plan
-
 
 class UndoRedoManager:
-    """Manages undo/redo functionality for plans."""
+    """Manages undo/redo functionality for plans.
+
+    Stacks are deques that store a full snapshot every CHECKPOINT_INTERVAL
+    entries and, in between, JSON patches against the entry below, so each
+    saved version only costs the size of what changed. Pushing past
+    MAX_STACK_SIZE evicts the oldest entry in place.
+    """
 
     MAX_STACK_SIZE = 50
+    CHECKPOINT_INTERVAL = 10
 
     def push_state(
         self,
@@ -866,32 +1057,31 @@ class UndoRedoManager:
         new_plan: dict[str, Any],
     ) -> dict[str, Any]:
         """Push current plan state onto undo stack before updating."""
-        state = deepcopy(state)
-        undo_stack = state.get("undo_stack", [])
+        # Only the stacks and current plan change, so the rest of the state is shared
+        state = state.copy()
+        undo_stack = deque(state.get("undo_stack", ()))
         current_plan = state.get("current_plan", {})
 
         if current_plan:
-            undo_stack.append(deepcopy(current_plan))
-            if len(undo_stack) > self.MAX_STACK_SIZE:
-                undo_stack.pop(0)
+            self._push(undo_stack, current_plan)
 
         state["undo_stack"] = undo_stack
-        state["redo_stack"] = []
-        state["current_plan"] = deepcopy(new_plan)
+        state["redo_stack"] = deque()
+        state["current_plan"] = _fast_clone_plan(new_plan)
         return state
 
     def undo(self, state: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any]]:
         """Undo the last plan change."""
-        state = deepcopy(state)
-        undo_stack = state.get("undo_stack", [])
-        redo_stack = state.get("redo_stack", [])
+        state = state.copy()
+        undo_stack = deque(state.get("undo_stack", ()))
+        redo_stack = deque(state.get("redo_stack", ()))
         current_plan = state.get("current_plan", {})
 
         if not undo_stack:
             return None, state
 
-        redo_stack.append(deepcopy(current_plan))
-        previous_plan = undo_stack.pop()
+        self._push(redo_stack, current_plan)
+        previous_plan = self._pop(undo_stack)
 
         state["redo_stack"] = redo_stack
         state["undo_stack"] = undo_stack
@@ -900,22 +1090,29 @@ class UndoRedoManager:
 
     def redo(self, state: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any]]:
         """Redo the last undone change."""
-        state = deepcopy(state)
-        redo_stack = state.get("redo_stack", [])
-        undo_stack = state.get("undo_stack", [])
+        state = state.copy()
+        redo_stack = deque(state.get("redo_stack", ()))
+        undo_stack = deque(state.get("undo_stack", ()))
         current_plan = state.get("current_plan", {})
 
         if not redo_stack:
             return None, state
 
-        undo_stack.append(deepcopy(current_plan))
-        next_plan = redo_stack.pop()
+        self._push(undo_stack, current_plan)
+        next_plan = self._pop(redo_stack)
 
         state["redo_stack"] = redo_stack
         state["undo_stack"] = undo_stack
 
         return next_plan, state
 
+    def peek_undo(self, state: dict[str, Any]) -> dict[str, Any] | None:
+        """Get the plan that undo would restore, without changing the stacks."""
+        undo_stack = state.get("undo_stack", [])
+        if not undo_stack:
+            return None
+        return self._plan_at(undo_stack, len(undo_stack) - 1)
+
     def can_undo(self, state: dict[str, Any]) -> bool:
         """Check if undo is available."""
         return bool(state.get("undo_stack", []))
@@ -924,6 +1121,65 @@ class UndoRedoManager:
         """Check if redo is available."""
         return bool(state.get("redo_stack", []))
 
+    @classmethod
+    def trim_stack(cls, stack: deque[dict[str, Any]], max_size: int) -> deque[dict[str, Any]]:
+        """Return a copy of stack keeping only its newest max_size entries."""
+        trimmed = deque(stack)
+        cls._evict(trimmed, max_size)
+        return trimmed
+
+    @staticmethod
+    def _snapshot(plan: dict[str, Any]) -> dict[str, Any]:
+        """Copy a plan as plain JSON data so patches address every key consistently."""
+        return _fast_clone_plan(plan)
+
+    @classmethod
+    def _push(cls, stack: deque[dict[str, Any]], plan: dict[str, Any]) -> None:
+        snapshot = cls._snapshot(plan)
+
+        if stack:
+            checkpoint = len(stack) - 1
+            while checkpoint > 0 and "patch" in stack[checkpoint]:
+                checkpoint -= 1
+
+            if len(stack) - checkpoint < cls.CHECKPOINT_INTERVAL:
+                previous = cls._plan_at(stack, len(stack) - 1)
+                stack.append({"patch": jsonpatch.make_patch(previous, snapshot).patch})
+                cls._evict(stack, cls.MAX_STACK_SIZE)
+                return
+
+        stack.append({"snapshot": snapshot})
+        cls._evict(stack, cls.MAX_STACK_SIZE)
+
+    @classmethod
+    def _evict(cls, stack: deque[dict[str, Any]], max_size: int) -> None:
+        """Drop the oldest entries until at most max_size remain."""
+        while len(stack) > max_size:
+            # The next entry may be a patch, so turn it into a snapshot first
+            if len(stack) > 1 and "patch" in stack[1]:
+                stack[1] = {"snapshot": cls._plan_at(stack, 1)}
+            stack.popleft()
+
+    @classmethod
+    def _pop(cls, stack: deque[dict[str, Any]]) -> dict[str, Any]:
+        plan = cls._plan_at(stack, len(stack) - 1)
+        stack.pop()
+        return plan
+
+    @staticmethod
+    def _plan_at(stack: deque[dict[str, Any]], index: int) -> dict[str, Any]:
+        """Rebuild the plan at index from the nearest snapshot below it."""
+        start = index
+        while start > 0 and "patch" in stack[start]:
+            start -= 1
+
+        # Stacks saved before patches were introduced hold bare plans
+        base = stack[start].get("snapshot", stack[start])
+        plan = _fast_clone_plan(base)
+        for entry in islice(stack, start + 1, index + 1):
+            plan = jsonpatch.apply_patch(plan, entry["patch"], in_place=True)
+        return plan
+
 
 class RiskAssessor:
     """Assesses risks for plan steps."""
@@ -932,6 +1188,9 @@ class RiskAssessor:
         "high": ["critical", "urgent", "deadline", "external", "third-party", "approval", "legal"],
         "medium": ["integration", "testing", "review", "feedback", "coordination"],
     }
+    # One scan per level rules a step out; keywords are only listed for steps that match
+    _HIGH_RE = _keyword_pattern(*RISK_KEYWORDS["high"])
+    _MEDIUM_RE = _keyword_pattern(*RISK_KEYWORDS["medium"])
 
     def assess_risks(self, plan: dict[str, Any]) -> list[dict[str, Any]]:
         """Assess risks for each step in the plan."""
@@ -941,18 +1200,17 @@ class RiskAssessor:
         for step in steps:
             desc_lower = step["description"].lower()
             risk_level = "low"
-            risk_factors = []
-
-            for keyword in self.RISK_KEYWORDS["high"]:
-                if keyword in desc_lower:
-                    risk_level = "high"
-                    risk_factors.append(f"Contains '{keyword}'")
 
-            if risk_level == "low":
-                for keyword in self.RISK_KEYWORDS["medium"]:
-                    if keyword in desc_lower:
-                        risk_level = "medium"
-                        risk_factors.append(f"Contains '{keyword}'")
+            if self._HIGH_RE.search(desc_lower):
+                risk_level = "high"
+                keywords = self.RISK_KEYWORDS["high"]
+            elif self._MEDIUM_RE.search(desc_lower):
+                risk_level = "medium"
+                keywords = self.RISK_KEYWORDS["medium"]
+            else:
+                keywords = ()
+            matched = frozenset(k for k in keywords if k in desc_lower)
+            risk_factors = [f"Contains '{k}'" for k in keywords if k in matched]
 
             dependencies = plan.get("metadata", {}).get("dependencies", {})
             deps = dependencies.get(str(step["id"]), [])
@@ -966,21 +1224,21 @@ class RiskAssessor:
                     "description": step["description"],
                     "risk_level": risk_level,
                     "risk_factors": risk_factors,
-                    "mitigation": self._suggest_mitigation(risk_level, risk_factors),
+                    "mitigation": self._suggest_mitigation(risk_level, matched),
                 }
             )
 
         return risks
 
-    def _suggest_mitigation(self, risk_level: str, factors: list[str]) -> str:
-        """Suggest mitigation strategies based on risk."""
+    def _suggest_mitigation(self, risk_level: str, matched_keywords: frozenset[str]) -> str:
+        """Suggest mitigation strategies based on risk and the keywords that raised it."""
         if risk_level == "low":
             return "Monitor as normal"
-        elif "deadline" in str(factors).lower() or "urgent" in str(factors).lower():
+        elif not matched_keywords.isdisjoint(("deadline", "urgent")):
             return "Add buffer time, set earlier internal deadline"
-        elif "external" in str(factors).lower() or "third-party" in str(factors).lower():
+        elif not matched_keywords.isdisjoint(("external", "third-party")):
             return "Establish clear SLAs, have backup options"
-        elif "integration" in str(factors).lower():
+        elif "integration" in matched_keywords:
             return "Plan integration testing early, document interfaces"
         else:
             return "Review regularly, identify blockers early"
@@ -994,60 +1252,53 @@ class SmartEstimator:
         "complex": ["develop", "build", "implement", "design", "architect", "integrate"],
         "research": ["research", "analyze", "investigate", "evaluate", "assess"],
     }
+    # Checked from highest to lowest precedence; the first matching type wins
+    _TYPE_PATTERNS = (
+        ("research", _keyword_pattern(*COMPLEXITY_PATTERNS["research"])),
+        ("complex", _keyword_pattern(*COMPLEXITY_PATTERNS["complex"])),
+        ("simple", _keyword_pattern(*COMPLEXITY_PATTERNS["simple"])),
+    )
 
-    def estimate_step(self, description: str) -> dict[str, Any]:
-        """Estimate time and complexity for a step."""
-        desc_lower = description.lower()
-
-        step_type = "medium"
-        for pattern in self.COMPLEXITY_PATTERNS["simple"]:
-            if pattern in desc_lower:
-                step_type = "simple"
-                break
-
-        for pattern in self.COMPLEXITY_PATTERNS["complex"]:
-            if pattern in desc_lower:
-                step_type = "complex"
-                break
-
-        for pattern in self.COMPLEXITY_PATTERNS["research"]:
-            if pattern in desc_lower:
-                step_type = "research"
-                break
-
-        estimates = {
-            "simple": {"hours": 4, "days": 0.5, "confidence": "high"},
-            "medium": {"hours": 8, "days": 1, "confidence": "medium"},
-            "complex": {"hours": 24, "days": 3, "confidence": "medium"},
-            "research": {"hours": 16, "days": 2, "confidence": "low"},
+    # step type -> (hours, days, confidence)
+    _ESTIMATES = MappingProxyType(
+        {
+            "simple": (4, 0.5, "high"),
+            "medium": (8, 1, "medium"),
+            "complex": (24, 3, "medium"),
+            "research": (16, 2, "low"),
         }
+    )
 
-        estimate = estimates[step_type]
+    def estimate_step(self, description: str) -> dict[str, Any]:
+        """Estimate time and complexity for a step."""
+        step_type, hours, days, confidence = _estimate_description(description)
 
         return {
             "description": description,
             "type": step_type,
-            "estimated_hours": estimate["hours"],
-            "estimated_days": estimate["days"],
-            "confidence": estimate["confidence"],
+            "estimated_hours": hours,
+            "estimated_days": days,
+            "confidence": confidence,
         }
 
     def estimate_plan(self, plan: dict[str, Any]) -> dict[str, Any]:
         """Estimate total plan duration."""
         steps = plan.get("steps", [])
 
-        total_hours = 0
-        step_estimates = []
-
-        for step in steps:
-            estimate = self.estimate_step(step["description"])
-            step_estimates.append(
-                {
-                    "step_id": step["id"],
-                    **estimate,
-                }
-            )
-            total_hours += estimate["estimated_hours"]
+        # Build each step's entry once from the cached estimate instead of merging dicts
+        step_estimates = [
+            {
+                "step_id": step["id"],
+                "description": step["description"],
+                "type": step_type,
+                "estimated_hours": hours,
+                "estimated_days": days,
+                "confidence": confidence,
+            }
+            for step in steps
+            for step_type, hours, days, confidence in (_estimate_description(step["description"]),)
+        ]
+        total_hours = sum(estimate["estimated_hours"] for estimate in step_estimates)
 
         working_days = total_hours / 8
         calendar_weeks = working_days / 5
@@ -1065,6 +1316,17 @@ class SmartEstimator:
         }
 
 
+@lru_cache(maxsize=2048)
+def _estimate_description(description: str) -> tuple[str, int, float, str]:
+    """Classify a step description and look up its (type, hours, days, confidence)."""
+    desc_lower = description.lower()
+    step_type = next(
+        (name for name, pattern in SmartEstimator._TYPE_PATTERNS if pattern.search(desc_lower)),
+        "medium",
+    )
+    return (step_type, *SmartEstimator._ESTIMATES[step_type])
+
+
 class SuggestionEngine:
     """Generates smart suggestions for plans."""
 
@@ -1090,22 +1352,28 @@ class SuggestionEngine:
         ],
         "project": ["Risk assessment", "Stakeholder updates", "Documentation", "Lessons learned"],
     }
+    # category -> ((suggestion, lowercased suggestion), ...)
+    _LOWERED_SUGGESTIONS = MappingProxyType(
+        {
+            category: tuple((s, s.lower()) for s in suggested_steps)
+            for category, suggested_steps in STEP_SUGGESTIONS.items()
+        }
+    )
 
     def suggest_missing_steps(self, plan: dict[str, Any]) -> list[str]:
         """Suggest steps that might be missing from the plan."""
         suggestions = []
         title_lower = plan.get("title", "").lower()
         steps = plan.get("steps", [])
-        step_text = " ".join(s["description"].lower() for s in steps)
+        descs_lower = [s["description"].lower() for s in steps]
+        step_text = " ".join(descs_lower)
 
-        for category, suggested_steps in self.STEP_SUGGESTIONS.items():
+        for category, suggested_steps in self._LOWERED_SUGGESTIONS.items():
             if category in title_lower:
-                for suggestion in suggested_steps:
-                    if suggestion.lower() not in step_text:
-                        suggestions.append(suggestion)
+                suggestions.extend(s for s, lowered in suggested_steps if lowered not in step_text)
 
-        has_testing = any("test" in s["description"].lower() for s in steps)
-        has_review = any("review" in s["description"].lower() for s in steps)
+        has_testing = any("test" in d for d in descs_lower)
+        has_review = any("review" in d for d in descs_lower)
 
         if len(steps) > 3 and not has_testing:
             suggestions.append("Testing/QA phase")
@@ -1135,11 +1403,36 @@ class SuggestionEngine:
         return improvements
 
 
+# (analysis name, serialised plan) -> result, oldest first
+_ANALYSIS_CACHE: dict[tuple[str, bytes], Any] = {}
+_ANALYSIS_CACHE_SIZE = 128
+
+
+def _cached_analysis(
+    name: str,
+    plan: dict[str, Any],
+    analyse: Callable[[dict[str, Any]], Any],
+) -> Any:
+    """Run a read-only analysis once per distinct plan content.
+
+    The key is the plan's serialised content rather than its version, because several
+    tools (dependencies, due dates, batch operations) change a plan without bumping it.
+    Each caller gets its own copy of the cached result.
+    """
+    key = (name, orjson.dumps(plan, option=orjson.OPT_NON_STR_KEYS, default=str))
+    result = _ANALYSIS_CACHE.get(key)
+    if result is None:
+        result = analyse(plan)
+        if len(_ANALYSIS_CACHE) >= _ANALYSIS_CACHE_SIZE:
+            del _ANALYSIS_CACHE[next(iter(_ANALYSIS_CACHE))]
+        _ANALYSIS_CACHE[key] = result
+    return _fast_clone_plan(result)
+
+
 @tool
 def validate_plan(plan: dict[str, Any]) -> dict[str, Any]:
     """Validate a plan for logical consistency and completeness."""
-    validator = PlanValidator()
-    return validator.validate(plan)
+    return _cached_analysis("validate", plan, PlanValidator().validate)
 
 
 @tool
@@ -1205,8 +1498,7 @@ def batch_update_steps(
 @tool
 def assess_plan_risks(current_plan: dict[str, Any]) -> list[dict[str, Any]]:
     """Assess risks for all steps in the plan."""
-    assessor = RiskAssessor()
-    return assessor.assess_risks(current_plan)
+    return _cached_analysis("risks", current_plan, RiskAssessor().assess_risks)
 
 
 @tool
@@ -1226,24 +1518,37 @@ def suggest_plan_improvements(current_plan: dict[str, Any]) -> dict[str, Any]:
     }
 
 
+@tool
+def analyze_plan(current_plan: dict[str, Any]) -> dict[str, Any]:
+    """Assess risks, estimate duration and suggest improvements for the plan in one call."""
+    engine = SuggestionEngine()
+    return {
+        "risks": _cached_analysis("risks", current_plan, RiskAssessor().assess_risks),
+        "duration": SmartEstimator().estimate_plan(current_plan),
+        "suggestions": {
+            "missing_steps": engine.suggest_missing_steps(current_plan),
+            "improvements": engine.suggest_improvements(current_plan),
+        },
+    }
+
+
 @tool
 def mark_milestone(
     current_plan: dict[str, Any],
     step_id: int,
 ) -> dict[str, Any]:
     """Mark a step as a key milestone."""
-    plan = deepcopy(current_plan)
-    metadata = plan.setdefault("metadata", {})
-    milestones = metadata.setdefault("milestones", [])
-
-    if step_id not in milestones:
-        milestones.append(step_id)
-        milestones.sort()
+    plan = current_plan.copy()
+    metadata = plan["metadata"] = {**plan.get("metadata", {})}
+    # Lists from older sessions, imports and templates may be unsorted or hold duplicates
+    metadata["milestones"] = sorted({*metadata.get("milestones", ()), step_id})
 
-    for step in plan.get("steps", []):
-        if step["id"] == step_id:
-            step["is_milestone"] = True
-            break
+    steps = plan.get("steps", [])
+    index = _find_step_index(steps, step_id)
+    if index is not None:
+        # Replace only the touched step; the others stay shared with the input
+        steps = plan["steps"] = list(steps)
+        steps[index] = {**steps[index], "is_milestone": True}
 
     return plan
 
@@ -1255,13 +1560,17 @@ def expand_step_with_substeps(
     sub_steps: list[str],
 ) -> dict[str, Any]:
     """Expand a step into detailed sub-steps."""
-    plan = deepcopy(current_plan)
+    plan = current_plan.copy()
     steps = plan.get("steps", [])
     timestamp = datetime.now().isoformat()
 
-    for step in steps:
-        if step["id"] == step_id:
-            step["sub_steps"] = [
+    index = _find_step_index(steps, step_id)
+    if index is not None:
+        # Replace only the expanded step; the others stay shared with the input
+        steps = plan["steps"] = list(steps)
+        steps[index] = {
+            **steps[index],
+            "sub_steps": [
                 {
                     "id": i + 1,
                     "description": sub_desc,
@@ -1269,8 +1578,8 @@ def expand_step_with_substeps(
                     "created_at": timestamp,
                 }
                 for i, sub_desc in enumerate(sub_steps)
-            ]
-            break
+            ],
+        }
 
     return plan
 
@@ -1281,7 +1590,8 @@ def fork_plan(
     new_title: str,
 ) -> dict[str, Any]:
     """Create a copy of the current plan with a new title."""
-    plan = deepcopy(current_plan)
+    # The fork starts a fresh history, so the old one is never cloned
+    plan = _fast_clone_plan({**current_plan, "history": []})
     timestamp = datetime.now().isoformat()
 
     plan["title"] = new_title
@@ -1294,9 +1604,12 @@ def fork_plan(
             "timestamp": timestamp,
             "action": "forked",
             "title": new_title,
-            "steps": [s.copy() for s in plan.get("steps", [])],
+            # Shares the freshly cloned steps, like create_plan and update_plan do
+            "steps": plan.get("steps", []),
         }
     ]
     plan["summary"] = f"Fork of plan: {new_title}"
+    # Nor does it have any updates of its own yet
+    plan.get("metadata", {}).pop("update_count", None)
 
     return plan